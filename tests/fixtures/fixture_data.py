@@ -13,7 +13,8 @@ def mock_media(settings):
 
 
 @pytest.fixture
-def mixer():
+def mixer(mock_media):
+    # mixer сохраняет картинки постов в MEDIA_ROOT
     return _mixer
 
 
@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер: падает, если запросов к БД больше бюджета."""
+
+    @contextmanager
+    def check(limit, name=''):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        queries = '\n'.join(
+            f'{number}. {query["sql"]}'
+            for number, query in enumerate(context.captured_queries, 1)
+        )
+        assert executed <= limit, (
+            f'`{name}` выполняет {executed} запросов к БД '
+            f'при бюджете {limit}:\n{queries}'
+        )
+
+    return check
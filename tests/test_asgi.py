@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, environ
+from posts import live
+from posts.models import Comment
+
+
+REQUEST = ({'type': 'http.request', 'body': b''},)
+
+
+async def request(app, scope, messages=REQUEST):
+    incoming = list(messages)
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def run(app, scope, messages=REQUEST):
+    return asyncio.run(request(app, scope, messages))
+
+
+def get(path):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+    }
+
+
+class TestASGI:
+
+    def test_page(self):
+        sent = run(ASGIHandler(threads=1), get('/about/author/'))
+        assert sent[0]['type'] == 'http.response.start'
+        assert sent[0]['status'] == 200, (
+            'Проверьте, что ASGI-приложение отдаёт страницы Django'
+        )
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        assert 'Привет, я автор'.encode() in body
+        assert sent[-1].get('more_body', False) is False
+
+    def test_stream_does_not_hold_pool(self):
+        finished = {}
+
+        def slow():
+            for chunk in ('раз', 'два'):
+                time.sleep(0.3)
+                yield chunk
+
+        def app(environ, start_response):
+            if environ['PATH_INFO'] == '/slow/':
+                response = StreamingHttpResponse(slow())
+            else:
+                response = HttpResponse('ok')
+            start_response('200 OK', list(response.items()))
+            return response
+
+        async def timed(handler, path):
+            sent = await request(handler, get(path))
+            finished[path] = time.monotonic()
+            return sent
+
+        async def main(handler):
+            return await asyncio.gather(
+                timed(handler, '/slow/'), timed(handler, '/fast/'),
+            )
+
+        handler = ASGIHandler(threads=1)
+        handler.wsgi = app
+        slow_sent, fast_sent = asyncio.run(main(handler))
+        assert finished['/fast/'] < finished['/slow/'], (
+            'Проверьте, что потоковый ответ не занимает поток пула, '
+            'пока отдаётся клиенту'
+        )
+        body = b''.join(message.get('body', b'') for message in slow_sent)
+        assert body.decode() == 'раздва'
+        assert slow_sent[-1].get('more_body', False) is False
+
+    def test_environ(self):
+        result = environ({
+            'type': 'http',
+            'method': 'POST',
+            'path': '/profile/автор/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+            ],
+        }, body=None)
+        assert result['PATH_INFO'].encode('latin-1').decode() == (
+            '/profile/автор/'
+        )
+        assert result['QUERY_STRING'] == 'page=2'
+        assert result['CONTENT_TYPE'] == 'text/plain'
+        assert result['HTTP_COOKIE'] == 'a=1; b=2'
+
+    def test_lifespan(self):
+        sent = run(ASGIHandler(threads=1), {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+        assert [message['type'] for message in sent] == [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_streams_do_not_hold_pool(post, monkeypatch):
+    monkeypatch.setattr(live, 'STREAM_SECONDS', 1.5)
+    monkeypatch.setattr(live, 'POLL_INTERVAL', 0.1)
+    handler = ASGIHandler(threads=2)
+    path = reverse('posts:comment_stream', args=[post.pk])
+
+    async def main():
+        streams = [
+            asyncio.ensure_future(request(handler, get(path)))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0.3)
+        started = time.monotonic()
+        page = await request(handler, get('/about/author/'))
+        elapsed = time.monotonic() - started
+        assert not any(task.done() for task in streams)
+        readers = [
+            thread for thread in threading.enumerate()
+            if thread.name.startswith('yatube-asgi-stream')
+        ]
+        Comment.objects.create(post=post, author=post.author, text='Живой')
+        return page, elapsed, readers, await asyncio.gather(*streams)
+
+    page, elapsed, readers, streams = asyncio.run(main())
+    assert page[0]['status'] == 200
+    assert elapsed < 0.5, (
+        'Проверьте, что открытые потоки комментариев не занимают пул '
+        'и обычные страницы отдаются сразу'
+    )
+    assert readers == [], (
+        'Проверьте, что события SSE отдаются из цикла событий, '
+        'а не из отдельного потока на читателя'
+    )
+    for sent in streams:
+        body = b''.join(message.get('body', b'') for message in sent)
+        assert 'event: comment'.encode() in body
+        assert 'Живой'.encode() in body
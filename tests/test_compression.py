@@ -0,0 +1,70 @@
+import os
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+
+
+class TestCompression:
+
+    def test_html_compressed_above_threshold(self, settings, client):
+        settings.GZIP_MIN_LENGTH = 100
+        response = client.get('/about/author/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response.get('Content-Encoding') == 'gzip', (
+            'Проверьте, что HTML-страницы сжимаются gzip'
+        )
+
+    def test_small_responses_not_compressed(self, settings, client):
+        settings.GZIP_MIN_LENGTH = 10 ** 6
+        response = client.get('/about/author/', HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что ответы меньше GZIP_MIN_LENGTH не сжимаются'
+        )
+
+    def test_refused_encoding_not_used(self, settings, client):
+        settings.GZIP_MIN_LENGTH = 100
+        response = client.get(
+            '/about/author/', HTTP_ACCEPT_ENCODING='br, gzip;q=0'
+        )
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что gzip;q=0 в Accept-Encoding запрещает сжатие'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+
+    def test_csrf_pages_not_compressed(self, settings, client):
+        settings.GZIP_MIN_LENGTH = 100
+        response = client.get('/auth/login/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что страницы с CSRF-токеном не сжимаются (BREACH)'
+        )
+
+    def test_static_pipeline(self, settings, client, tmp_path):
+        settings.STATIC_ROOT = str(tmp_path)
+        settings.STATICFILES_STORAGE = (
+            'core.storage.CompressedManifestStaticFilesStorage'
+        )
+        settings.MIDDLEWARE = [
+            'core.middleware.StaticFilesMiddleware', *settings.MIDDLEWARE
+        ]
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = staticfiles_storage.url('img/placeholder.svg')
+        assert url != '/static/img/placeholder.svg', (
+            'Проверьте, что в именах собранной статики есть хэш'
+        )
+        name = staticfiles_storage.stored_name('img/placeholder.svg')
+        assert os.path.exists(os.path.join(str(tmp_path), name + '.gz')), (
+            'Проверьте, что collectstatic кладёт рядом .gz-копию'
+        )
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+        refused = client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        assert not refused.has_header('Content-Encoding'), (
+            'Проверьте, что q=0 в Accept-Encoding учитывается для статики'
+        )
+        assert 'immutable' in response['Cache-Control'], (
+            'Проверьте, что статика с хэшем кэшируется надолго'
+        )
+        assert staticfiles_storage.url('css/missing.css') == (
+            '/static/css/missing.css'
+        )
@@ -0,0 +1,51 @@
+import os
+
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from core import signals
+
+
+class TestDatabaseProfile:
+
+    def test_sqlite_pragmas(self, settings, tmp_path, django_db_blocker):
+        settings.SQLITE_PRAGMAS = settings.PRODUCTION_SQLITE_PRAGMAS
+        connection = DatabaseWrapper(dict(
+            connections['default'].settings_dict,
+            NAME=os.path.join(str(tmp_path), 'profile.sqlite3'),
+        ))
+        with django_db_blocker.unblock(), connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+        connection.close()
+        assert journal_mode == 'wal', (
+            'Проверьте, что в производственном профиле SQLite '
+            'работает в режиме WAL'
+        )
+        assert busy_timeout == (
+            settings.PRODUCTION_SQLITE_PRAGMAS['busy_timeout']
+        )
+
+    def test_health_check_closes_broken_connection(self, settings,
+                                                   monkeypatch):
+        settings.DB_HEALTH_CHECKS = True
+        closed = []
+
+        class Broken:
+            connection = object()
+
+            def is_usable(self):
+                return False
+
+            def close(self):
+                closed.append(self)
+
+        broken = Broken()
+        monkeypatch.setattr(signals.connections, 'all', lambda: [broken])
+        signals.check_connections(sender=None)
+        assert closed == [broken], (
+            'Проверьте, что перед запросом закрываются соединения, '
+            'которые не проходят проверку'
+        )
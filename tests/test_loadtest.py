@@ -0,0 +1,79 @@
+import pytest
+
+from core.bench import percentiles
+from core.loadtest import compare
+
+
+class TestPercentiles:
+
+    def test_empty(self):
+        assert percentiles([]) == {'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0}
+
+    def test_single_value(self):
+        assert percentiles([7.5]) == {
+            'p50_ms': 7.5, 'p95_ms': 7.5, 'p99_ms': 7.5,
+        }, 'Проверьте, что при одном замере все перцентили равны ему'
+
+    @pytest.mark.parametrize('timings, expected', [
+        ([1, 2], {'p50_ms': 1, 'p95_ms': 2, 'p99_ms': 2}),
+        ([1, 2, 3, 4], {'p50_ms': 2, 'p95_ms': 4, 'p99_ms': 4}),
+        (list(range(1, 11)), {'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 10}),
+        (list(range(1, 101)), {'p50_ms': 50, 'p95_ms': 95, 'p99_ms': 99}),
+    ])
+    def test_nearest_rank(self, timings, expected):
+        assert percentiles(timings) == expected, (
+            'Проверьте, что перцентиль считается методом ближайшего ранга '
+            'и не выходит за границы списка'
+        )
+
+
+class TestCompare:
+    baseline = {
+        'posts:index': {'rps': 100, 'p95_ms': 50, 'queries': 4},
+    }
+
+    def test_within_tolerance(self):
+        report = {'posts:index': {'rps': 91, 'p95_ms': 55, 'queries': 4}}
+        assert compare(report, self.baseline) == [], (
+            'Проверьте, что ухудшение не больше tolerance не считается '
+            'регрессией'
+        )
+
+    def test_improvement_is_not_regression(self):
+        report = {'posts:index': {'rps': 300, 'p95_ms': 5, 'queries': 1}}
+        assert compare(report, self.baseline) == []
+
+    def test_regressions(self):
+        report = {'posts:index': {'rps': 80, 'p95_ms': 60, 'queries': 4}}
+        regressions = compare(report, self.baseline)
+        assert {item['metric'] for item in regressions} == {
+            'rps', 'p95_ms',
+        }, (
+            'Проверьте, что падение rps и рост p95 больше tolerance '
+            'считаются регрессией'
+        )
+        rps = next(item for item in regressions if item['metric'] == 'rps')
+        assert rps == {
+            'view': 'posts:index',
+            'metric': 'rps',
+            'baseline': 100,
+            'current': 80,
+            'change_pct': 20.0,
+        }
+
+    def test_custom_tolerance(self):
+        report = {'posts:index': {'rps': 100, 'p95_ms': 60, 'queries': 4}}
+        assert compare(report, self.baseline, tolerance=0.5) == []
+        assert len(compare(report, self.baseline, tolerance=0.05)) == 1
+
+    def test_unknown_views_and_zero_baseline(self):
+        report = {
+            'posts:index': {'rps': 100, 'p95_ms': 50, 'queries': 9},
+            'posts:search': {'rps': 1, 'p95_ms': 1000},
+        }
+        baseline = {'posts:index': dict(self.baseline['posts:index'],
+                                        queries=0)}
+        assert compare(report, baseline) == [], (
+            'Проверьте, что страницы без базовых значений и нулевые '
+            'базовые метрики пропускаются'
+        )
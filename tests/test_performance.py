@@ -0,0 +1,70 @@
+import json
+import logging
+
+import pytest
+from django.core.cache import cache
+
+from core.metrics import registry
+
+
+@pytest.fixture
+def sampled(settings):
+    settings.PERF_SAMPLE_RATE = 1
+    settings.PERF_TEMPLATE_TIMING = True
+    registry.reset()
+    cache.clear()
+
+
+class TestPerformanceMiddleware:
+
+    @pytest.mark.django_db
+    def test_server_timing_header(self, sampled, client, post, caplog):
+        with caplog.at_level(logging.INFO, logger='yatube.performance'):
+            response = client.get('/')
+        header = response['Server-Timing']
+        for name in ('app;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            assert name in header, (
+                f'Проверьте, что заголовок `Server-Timing` содержит `{name}`'
+            )
+        assert 'hit=0 miss=2' in header, (
+            'Проверьте, что в `Server-Timing` учтены промахи кэша карточки '
+            'и миниатюры'
+        )
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['view'] == 'posts:index'
+        assert record['sql_queries'] > 0
+
+    @pytest.mark.django_db
+    def test_unsampled_request(self, settings, client, post):
+        settings.PERF_SAMPLE_RATE = 0
+        response = client.get('/')
+        assert not response.has_header('Server-Timing'), (
+            'Проверьте, что запросы вне выборки не получают `Server-Timing`'
+        )
+
+    @pytest.mark.django_db
+    def test_metrics_endpoint(self, sampled, client, post):
+        client.get('/')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        body = response.content.decode()
+        assert (
+            'yatube_requests_total{view="posts:index",'
+            'method="GET",status="200"} 1'
+        ) in body
+        assert 'yatube_sampled_sql_queries_total{view="posts:index"}' in body
+        response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 403
+
+    @pytest.mark.django_db
+    def test_metrics_token(self, settings, client):
+        settings.METRICS_TOKEN = 'secret'
+        response = client.get('/metrics')
+        assert response.status_code == 403, (
+            'Проверьте, что при заданном токене адрес клиента не даёт '
+            'доступа к `/metrics`: за прокси все клиенты локальные'
+        )
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        assert response.status_code == 403
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
@@ -0,0 +1,84 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from posts import live
+from posts.models import Comment, Post
+from posts.urls import urlpatterns
+
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 7,
+    'posts:profile': 8,
+    'posts:post_detail': 6,
+    'posts:comment_stream': 2,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:add_comment': 5,
+    'posts:follow_index': 6,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 8,
+    'posts:export_data': 3,
+    'posts:search': 5,
+    'posts:feed': 1,
+    'posts:group_feed': 2,
+    'posts:profile_feed': 2,
+}
+
+
+@pytest.fixture
+def feed(mixer, user, another_user, group,
+         another_few_posts_with_group_with_follower, monkeypatch):
+    monkeypatch.setattr(live, 'STREAM_SECONDS', 0.05)
+    own_post = mixer.blend(
+        Post, author=user, group=group, text='Комментарий для поиска'
+    )
+    post = Post.objects.filter(author=another_user).first()
+    mixer.cycle(10).blend(Comment, post=post, author=user)
+    user.is_staff = True
+    user.save(update_fields=['is_staff'])
+    return {
+        'posts:index': ('get', {}),
+        'posts:group_list': ('get', {'slug': group.slug}),
+        'posts:profile': ('get', {'username': another_user.username}),
+        'posts:post_detail': ('get', {'post_id': post.id}),
+        'posts:comment_stream': ('get', {'post_id': post.id}),
+        'posts:post_create': ('get', {}),
+        'posts:post_edit': ('get', {'post_id': own_post.id}),
+        'posts:add_comment': ('post', {'post_id': post.id}),
+        'posts:follow_index': ('get', {}),
+        'posts:profile_follow': ('get', {'username': another_user.username}),
+        'posts:profile_unfollow': (
+            'get', {'username': another_user.username}
+        ),
+        'posts:export_data': ('get', {'name': 'posts'}),
+        'posts:search': ('get', {}),
+        'posts:feed': ('get', {'fmt': 'rss'}),
+        'posts:group_feed': ('get', {'key': group.slug, 'fmt': 'atom'}),
+        'posts:profile_feed': (
+            'get', {'key': another_user.username, 'fmt': 'json'}
+        ),
+    }
+
+
+class TestQueryBudget:
+
+    def test_every_view_has_budget(self):
+        names = {f'posts:{pattern.name}' for pattern in urlpatterns}
+        missing = names - set(QUERY_BUDGETS)
+        assert not missing, (
+            f'Задайте бюджет запросов к БД в `QUERY_BUDGETS` для {missing}'
+        )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('name', sorted(QUERY_BUDGETS))
+    def test_view_query_budget(self, name, user_client, feed, query_budget):
+        method, kwargs = feed[name]
+        url = reverse(name, kwargs=kwargs)
+        cache.clear()
+        with query_budget(QUERY_BUDGETS[name], name):
+            response = getattr(user_client, method)(
+                url, data={'text': 'Комментарий', 'q': 'комментарий'}
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
@@ -0,0 +1,105 @@
+import pytest
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import db_routers
+
+
+@pytest.fixture
+def replica_reads(settings, monkeypatch):
+    """Реплика указывает на ту же базу; записываем, куда шло чтение."""
+    settings.DATABASE_REPLICAS = ['default']
+    calls = []
+    read_from = db_routers.read_from
+
+    def spy(alias):
+        calls.append(alias)
+        read_from(alias)
+
+    monkeypatch.setattr(db_routers, 'read_from', spy)
+    return calls
+
+
+class TestReplicaRouter:
+
+    def test_router(self, settings):
+        settings.DATABASE_REPLICAS = ['replica_1']
+        router = db_routers.ReplicaRouter()
+        assert router.db_for_read(Post) == 'default'
+        db_routers.read_from('replica_1')
+        try:
+            assert router.db_for_read(Post) == 'replica_1', (
+                'Проверьте, что чтение идёт на выбранную реплику'
+            )
+            assert router.db_for_write(Post) == 'default', (
+                'Проверьте, что запись всегда идёт в основную базу'
+            )
+        finally:
+            db_routers.read_from(None)
+        bench_post = Post()
+        bench_post._state.db = 'bench'
+        assert router.db_for_write(Post, instance=bench_post) == 'bench', (
+            'Проверьте, что объекты отдельной базы вне пула реплик '
+            'пишутся в свою базу'
+        )
+        assert router.db_for_read(Post, instance=bench_post) == 'bench'
+        assert router.allow_migrate('default', 'posts')
+        assert not router.allow_migrate('replica_1', 'posts'), (
+            'Проверьте, что миграции не применяются к репликам'
+        )
+
+
+class TestReplicaMiddleware:
+
+    @pytest.mark.django_db
+    def test_read_views_use_replica(self, client, post, replica_reads):
+        response = client.get(reverse('posts:index'))
+        assert response.status_code == 200
+        assert replica_reads == ['default', None], (
+            'Проверьте, что главная страница читает данные с реплики, '
+            'а после ответа чтение возвращается в основную базу'
+        )
+        assert db_routers.current_read_alias() is None
+
+    @pytest.mark.django_db
+    def test_writes_stick_to_primary(self, user_client, post, replica_reads):
+        response = user_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Новый комментарий'},
+        )
+        assert post.comments.count() == 1
+        assert 'yatube_primary' in response.cookies, (
+            'Проверьте, что после записи выставляется cookie привязки '
+            'к основной базе'
+        )
+        replica_reads.clear()
+        user_client.get(reverse('posts:index'))
+        assert replica_reads == [None], (
+            'Проверьте, что после записи пользователь читает из основной базы'
+        )
+
+    @pytest.mark.django_db
+    def test_follow_sticks_to_primary(self, user_client, another_user,
+                                      replica_reads):
+        response = user_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': another_user.username}
+        ))
+        assert 'yatube_primary' in response.cookies, (
+            'Проверьте, что GET-представления из REPLICA_WRITE_VIEWS '
+            'привязывают пользователя к основной базе'
+        )
+        replica_reads.clear()
+        response = user_client.get(reverse(
+            'posts:profile', kwargs={'username': another_user.username}
+        ))
+        assert replica_reads == [None]
+        assert response.context['following'], (
+            'Проверьте, что после подписки профиль читается из основной базы'
+        )
+
+    @pytest.mark.django_db
+    def test_other_views_use_primary(self, user_client, replica_reads):
+        user_client.get(reverse('posts:search'), {'q': 'пост'})
+        assert replica_reads == [None], (
+            'Проверьте, что страницы вне REPLICA_VIEWS читают основную базу'
+        )
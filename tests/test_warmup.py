@@ -0,0 +1,15 @@
+import os
+
+from django.conf import settings
+
+from core.warmup import warm_templates
+
+
+def test_warm_templates_compiles_all():
+    total = sum(
+        len([name for name in files if name.endswith('.html')])
+        for _, _, files in os.walk(settings.TEMPLATES_DIR)
+    )
+    assert warm_templates() == total, (
+        'Проверьте, что прогрев компилирует все шаблоны из `templates/`'
+    )
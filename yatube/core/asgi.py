@@ -0,0 +1,239 @@
+"""
+ASGI-адаптер для WSGI-обработчика Django 2.2.
+
+Тело запроса читается и ответ отправляется в цикле событий, а
+представление, ORM и шаблоны выполняются в пуле потоков. Поток пула
+занят только на время обработки, поэтому медленные клиенты его не
+держат. Потоковый ответ (выгрузку) цикл событий читает по куску через
+отдельный поток этого ответа: итератор работает с курсором БД, и все
+его запросы должны идти из одного потока, но пул он не занимает.
+
+Ответ с атрибутом async_stream (события SSE) отдаётся целиком из
+цикла событий: async_stream(run_sync) — асинхронный итератор, который
+сам отправляет в пул только короткие синхронные шаги.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import close_old_connections, connections
+
+
+class ASGIHandler:
+
+    def __init__(self, threads=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='yatube-asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, response = await loop.run_in_executor(
+                self.executor, self.handle, environ(scope, body),
+            )
+        finally:
+            body.close()
+        await send(start_message(status, headers))
+        if isinstance(response, list):
+            for chunk in response:
+                await send_chunk(send, chunk)
+        elif callable(response):
+            if not await self.send_async(response, receive, send):
+                return
+        else:
+            await self.send_stream(response, send)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса во временном файле; None, если клиент ушёл."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b',
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def handle(self, environ):
+        """
+        Обрабатывает запрос в потоке пула.
+
+        Обычный ответ собирается целиком; потоковый возвращается
+        нетронутым, его отдаёт send_stream, а вместо ответа с
+        async_stream возвращается сам async_stream.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        response = self.wsgi(environ, start_response)
+        stream = getattr(response, 'async_stream', None)
+        if stream is not None:
+            response.close()
+            return started[0], started[1], stream
+        if getattr(response, 'streaming', False):
+            # Соединения этого потока закрываем, как request_finished;
+            # сам ответ закроет поток, который его читает.
+            close_old_connections()
+            return started[0], started[1], response
+        try:
+            return started[0], started[1], list(response)
+        finally:
+            # request_finished закрывает соединения с БД этого потока.
+            response.close()
+
+    async def send_stream(self, response, send):
+        """Отдаёт потоковый ответ, читая его в собственном потоке."""
+        loop = asyncio.get_running_loop()
+        reader = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='yatube-asgi-stream',
+        )
+        chunks = iter(response)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(reader, next, chunks, None)
+                if chunk is None:
+                    return
+                await send_chunk(send, chunk)
+        finally:
+            await loop.run_in_executor(reader, finish_stream, response)
+            reader.shutdown(wait=False)
+
+    async def send_async(self, stream, receive, send):
+        """
+        Отдаёт асинхронный поток; False, если клиент отключился раньше.
+        """
+        async def pump():
+            async for chunk in stream(self.run_sync):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                await send_chunk(send, chunk)
+
+        pumping = asyncio.ensure_future(pump())
+        leaving = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            await asyncio.wait(
+                {pumping, leaving}, return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            leaving.cancel()
+            pumping.cancel()
+        await asyncio.wait({pumping})
+        if pumping.cancelled():
+            return False
+        pumping.result()
+        return True
+
+    async def run_sync(self, func, *args):
+        """Выполняет короткий синхронный шаг потока в пуле."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, call_closing, func, *args,
+        )
+
+
+def call_closing(func, *args):
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def finish_stream(response):
+    response.close()
+    # Поток ответа больше не нужен — его соединения тоже.
+    connections.close_all()
+
+
+async def send_chunk(send, chunk):
+    if chunk:
+        await send({
+            'type': 'http.response.body',
+            'body': chunk,
+            'more_body': True,
+        })
+
+
+def start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ],
+    }
+
+
+def environ(scope, body):
+    """WSGI environ по ASGI scope."""
+    path = scope['path']
+    root = scope.get('root_path', '')
+    if root and path.startswith(root):
+        path = path[len(root):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in result:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{result[name]}{separator}{value}'
+        result[name] = value
+    return result
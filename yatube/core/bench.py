@@ -0,0 +1,160 @@
+"""Общие инструменты для команд замера производительности."""
+import math
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from faker import Faker
+
+from posts.counters import rebuild_counters
+from posts.importer import manual_dates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BENCH_ALIAS = 'bench'
+BATCH_SIZE = 5000
+TEXTS_POOL = 500
+
+
+def use_sqlite_database(path, alias=BENCH_ALIAS):
+    """Подключает отдельный файл SQLite и применяет к нему миграции."""
+    connections.databases[alias] = dict(
+        settings.DATABASES['default'],
+        ENGINE='django.db.backends.sqlite3',
+        NAME=path,
+    )
+    call_command('migrate', database=alias, verbosity=0)
+    return alias
+
+
+def use_default_sqlite(path):
+    """Подменяет базу по умолчанию файлом SQLite с миграциями."""
+    connections[DEFAULT_DB_ALIAS].close()
+    connections.databases[DEFAULT_DB_ALIAS].update(
+        ENGINE='django.db.backends.sqlite3', NAME=path,
+    )
+    call_command('migrate', verbosity=0)
+
+
+def _batches(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_dataset(using, users=100, groups=10, posts=1000, comments=1000,
+                 follows=1000, seed=0, stdout=None):
+    """
+    Наполняет базу синтетическими данными.
+
+    Даты постов равномерно растянуты на год назад, чтобы порядок ленты
+    был похож на настоящий. Счётчики пересчитываются в конце.
+    """
+    fake = Faker('ru_RU')
+    Faker.seed(seed)
+    rnd = random.Random(seed)
+    texts = [fake.paragraph() for _ in range(TEXTS_POOL)]
+    now = timezone.now()
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    offset = User.objects.using(using).count()
+    User.objects.using(using).bulk_create(
+        (User(username=f'bench_{offset + number}')
+         for number in range(users)),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.using(using).values_list('pk', flat=True))
+    offset = Group.objects.using(using).count()
+    Group.objects.using(using).bulk_create(
+        Group(
+            title=fake.catch_phrase()[:200],
+            slug=f'bench-{offset + number}',
+            description=fake.sentence(),
+        )
+        for number in range(groups)
+    )
+    group_ids = list(Group.objects.using(using).values_list('pk', flat=True))
+    log(f'Пользователей: {len(user_ids)}, групп: {len(group_ids)}')
+
+    step = timedelta(days=365) / max(posts, 1)
+    with manual_dates(Post, 'pub_date'), manual_dates(Comment, 'created'):
+        new_posts = (
+            Post(
+                text=rnd.choice(texts),
+                author_id=rnd.choice(user_ids),
+                group_id=rnd.choice(group_ids + [None]),
+                pub_date=now - step * (posts - number),
+            )
+            for number in range(posts)
+        )
+        for batch in _batches(new_posts):
+            Post.objects.using(using).bulk_create(batch)
+        log(f'Постов: {posts}')
+        post_range = Post.objects.using(using).order_by('pk').values_list(
+            'pk', flat=True)
+        low, high = post_range.first(), post_range.last()
+        new_comments = (
+            Comment(
+                post_id=rnd.randint(low, high),
+                author_id=rnd.choice(user_ids),
+                text=rnd.choice(texts),
+                created=now - step * rnd.randint(0, posts),
+            )
+            for _ in range(comments if low else 0)
+        )
+        for batch in _batches(new_comments):
+            Comment.objects.using(using).bulk_create(batch)
+        log(f'Комментариев: {comments}')
+
+    pairs = {
+        (rnd.choice(user_ids), rnd.choice(user_ids)) for _ in range(follows)
+    }
+    for batch in _batches(
+        Follow(user_id=user, author_id=author)
+        for user, author in pairs if user != author
+    ):
+        Follow.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+    log(f'Подписок: {len(pairs)}')
+    rebuild_counters(using)
+    return user_ids, group_ids
+
+
+def measure(func, repeat=20):
+    """Медиана и p95 времени вызова func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': percentiles(timings)['p95_ms'],
+    }
+
+
+def percentiles(timings):
+    """p50, p95 и p99 отсортированных замеров в миллисекундах."""
+    def rank(share):
+        if not timings:
+            return 0
+        return round(timings[max(math.ceil(len(timings) * share) - 1, 0)], 3)
+    return {
+        'p50_ms': rank(0.5),
+        'p95_ms': rank(0.95),
+        'p99_ms': rank(0.99),
+    }
@@ -0,0 +1,304 @@
+"""Нагрузочный прогон основных страниц через WSGI-приложение."""
+import asyncio
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+from django.urls import reverse
+
+from core.bench import percentiles
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+POOL_SIZE = 200
+# Какое направление изменения метрики считается улучшением.
+METRICS = {
+    'rps': 'higher',
+    'p50_ms': 'lower',
+    'p95_ms': 'lower',
+    'p99_ms': 'lower',
+    'queries': 'lower',
+}
+
+
+class Scenario:
+    """Набор адресов одной страницы; make(rnd) выбирает очередной запрос."""
+
+    def __init__(self, name, method, make, auth=False):
+        self.name = name
+        self.method = method
+        self.make = make
+        self.auth = auth
+
+
+def _sample(queryset, field, size=POOL_SIZE):
+    return list(queryset.order_by('?').values_list(field, flat=True)[:size])
+
+
+def build_scenarios():
+    """Сценарии для главных страниц на данных, уже лежащих в базе."""
+    post_ids = _sample(Post.objects.all(), 'pk')
+    slugs = _sample(Group.objects.all(), 'slug')
+    authors = _sample(User.objects.filter(posts__isnull=False).distinct(),
+                      'username')
+    if not post_ids or not slugs or not authors:
+        raise ValueError('В базе нет постов, групп или авторов для прогона.')
+    scenarios = [
+        Scenario('index', 'GET', lambda rnd: (
+            reverse('posts:index'), {'page': rnd.randint(1, 5)})),
+        Scenario('group_posts', 'GET', lambda rnd: (
+            reverse('posts:group_list', args=[rnd.choice(slugs)]), {})),
+        Scenario('profile', 'GET', lambda rnd: (
+            reverse('posts:profile', args=[rnd.choice(authors)]), {})),
+        Scenario('post_detail', 'GET', lambda rnd: (
+            reverse('posts:post_detail', args=[rnd.choice(post_ids)]), {})),
+        Scenario('follow_index', 'GET', lambda rnd: (
+            reverse('posts:follow_index'), {}), auth=True),
+        Scenario('add_comment', 'POST', lambda rnd: (
+            reverse('posts:add_comment', args=[rnd.choice(post_ids)]),
+            {'text': f'Нагрузочный комментарий {rnd.random()}'}), auth=True),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def login_cookies():
+    """Cookie сессии и CSRF-токен случайного подписчика."""
+    follow = Follow.objects.order_by('?').first()
+    user = follow.user if follow else User.objects.first()
+    client = Client()
+    client.force_login(user)
+    request = HttpRequest()
+    token = get_token(request)
+    cookies = {
+        settings.SESSION_COOKIE_NAME: client.cookies[
+            settings.SESSION_COOKIE_NAME].value,
+        settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+    }
+    return cookies, token
+
+
+def call(app, method, path, params, cookies=None, csrf_token=None):
+    """Выполняет запрос к WSGI-приложению и возвращает код ответа."""
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path}
+    body = b''
+    if method == 'GET':
+        environ['QUERY_STRING'] = urlencode(params)
+    else:
+        body = urlencode(
+            dict(params, csrfmiddlewaretoken=csrf_token or '')
+        ).encode()
+        environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+        environ['CONTENT_LENGTH'] = str(len(body))
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        )
+    environ['wsgi.input'] = io.BytesIO(body)
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    result = app(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_call(app, method, path, params, cookies=None,
+                    csrf_token=None, read_delay=0):
+    """
+    Выполняет запрос к ASGI-приложению и возвращает код ответа.
+
+    read_delay имитирует медленного клиента: столько секунд уходит
+    на получение ответа.
+    """
+    body = b''
+    query = b''
+    headers = [(b'host', b'testserver')]
+    if method == 'GET':
+        query = urlencode(params).encode()
+    else:
+        body = urlencode(
+            dict(params, csrfmiddlewaretoken=csrf_token or '')
+        ).encode()
+        headers.append(
+            (b'content-type', b'application/x-www-form-urlencoded'))
+        headers.append((b'content-length', str(len(body)).encode()))
+    if cookies:
+        headers.append((b'cookie', '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        ).encode()))
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query,
+        'headers': headers,
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif not message.get('more_body') and read_delay:
+            await asyncio.sleep(read_delay)
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+async def run_clients(request, scenarios, clients, requests, seed=0):
+    """
+    clients одновременных клиентов по requests запросов каждый.
+
+    request(scenario, rnd) — корутина, выполняющая один запрос
+    и возвращающая код ответа.
+    """
+    timings, errors = [], []
+
+    async def client(number):
+        rnd = random.Random(seed * 1000 + number)
+        for _ in range(requests):
+            scenario = rnd.choice(scenarios)
+            started = time.perf_counter()
+            status = await request(scenario, rnd)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors.append(status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    wall = time.perf_counter() - started
+    timings.sort()
+    return dict(
+        percentiles(timings),
+        requests=len(timings),
+        errors=len(errors),
+        rps=round(len(timings) / wall, 1) if wall else 0,
+    )
+
+
+def run_scenario(app, scenario, requests, concurrency, cookies=None,
+                 csrf_token=None, seed=0):
+    """
+    Выполняет requests запросов сценария в concurrency потоков.
+
+    Число запросов к БД считается обёрткой execute_wrapper на
+    соединении того потока, который обрабатывает запрос.
+    """
+    timings, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker(number, count):
+        rnd = random.Random(seed * 1000 + number)
+        executed = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            executed[0] += 1
+            return execute(sql, params, many, context)
+
+        for _ in range(count):
+            path, params = scenario.make(rnd)
+            executed[0] = 0
+            started = time.perf_counter()
+            with connection.execute_wrapper(count_queries):
+                status = call(
+                    app, scenario.method, path, params,
+                    cookies if scenario.auth else None, csrf_token,
+                )
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings.append(elapsed)
+                queries.append(executed[0])
+                if status >= 400:
+                    errors.append(status)
+
+    shares = [requests // concurrency] * concurrency
+    for number in range(requests % concurrency):
+        shares[number] += 1
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [
+            pool.submit(worker, number, count)
+            for number, count in enumerate(shares) if count
+        ]:
+            future.result()
+    wall = time.perf_counter() - started
+    timings.sort()
+    return dict(
+        percentiles(timings),
+        requests=len(timings),
+        errors=len(errors),
+        rps=round(len(timings) / wall, 1) if wall else 0,
+        queries=round(sum(queries) / max(len(queries), 1), 2),
+    )
+
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    Список регрессий относительно базового отчёта.
+
+    Метрика считается ухудшившейся, если она хуже базовой больше чем
+    на tolerance (доля, 0.1 — 10%).
+    """
+    regressions = []
+    for name, result in report.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, better in METRICS.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            if better == 'higher':
+                change = -change
+            if change > tolerance:
+                regressions.append({
+                    'view': name,
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'change_pct': round(change * 100, 1),
+                })
+    return regressions
+
+
+def run_mixed(app, jobs, cookies=None, csrf_token=None, seed=0):
+    """
+    Нагружает несколько страниц одновременно.
+
+    jobs — список (scenario, requests, concurrency); результат тот же,
+    что у run_scenario, для каждого сценария.
+    """
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {
+            scenario.name: pool.submit(
+                run_scenario, app, scenario, requests, concurrency,
+                cookies, csrf_token, seed,
+            )
+            for scenario, requests, concurrency in jobs
+        }
+    return {name: future.result() for name, future in futures.items()}
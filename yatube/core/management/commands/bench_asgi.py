@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import loadtest
+from core.asgi import ASGIHandler
+from core.bench import seed_dataset, use_default_sqlite
+from posts.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и ASGI при одинаковом числе потоков, когда '
+        'клиенты медленно забирают ответы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite, который подменит базу по умолчанию; '
+                 'новый файл наполняется синтетическими данными.',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20_000)
+        parser.add_argument('--comments', type=int, default=20_000)
+        parser.add_argument('--follows', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--views', nargs='+', metavar='VIEW',
+            default=['index', 'group_posts', 'profile', 'post_detail'],
+        )
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков у обоих вариантов.')
+        parser.add_argument('--clients', type=int, default=64,
+                            help='Одновременных клиентов.')
+        parser.add_argument('--requests', type=int, default=10,
+                            help='Запросов на каждого клиента.')
+        parser.add_argument('--read-delay', type=float, default=0.2,
+                            help='Секунд, за которые клиент читает ответ.')
+
+    def handle(self, *args, **options):
+        path = options['sqlite_path']
+        if path:
+            fresh = not os.path.exists(path)
+            use_default_sqlite(path)
+            if fresh:
+                seed_dataset(
+                    DEFAULT_DB_ALIAS,
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows=options['follows'],
+                    seed=options['seed'],
+                    stdout=self.stderr,
+                )
+                rebuild_feeds()
+        try:
+            scenarios = loadtest.build_scenarios()
+        except ValueError as error:
+            raise CommandError(error)
+        unknown = set(options['views']) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Неизвестные страницы: {sorted(unknown)}')
+        chosen = [scenarios[name] for name in options['views']]
+        threads, delay = options['threads'], options['read_delay']
+        report = {}
+        for name, request in (
+            ('wsgi', self.wsgi_request(threads, delay)),
+            ('asgi', self.asgi_request(threads, delay)),
+        ):
+            report[name] = dict(
+                asyncio.run(loadtest.run_clients(
+                    request, chosen, options['clients'],
+                    options['requests'], seed=options['seed'],
+                )),
+                threads=threads,
+                clients=options['clients'],
+            )
+            self.stderr.write(f'{name}: {report[name]}')
+        connections.close_all()
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def wsgi_request(self, threads, delay):
+        """
+        Многопоточный WSGI-сервер: поток сам отдаёт ответ клиенту
+        и занят, пока тот его читает.
+        """
+        app = get_wsgi_application()
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def blocking(scenario, path, params):
+            status = loadtest.call(app, scenario.method, path, params)
+            time.sleep(delay)
+            return status
+
+        async def request(scenario, rnd):
+            path, params = scenario.make(rnd)
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, blocking, scenario, path, params,
+            )
+        return request
+
+    def asgi_request(self, threads, delay):
+        app = ASGIHandler(threads)
+
+        async def request(scenario, rnd):
+            path, params = scenario.make(rnd)
+            return await loadtest.asgi_call(
+                app, scenario.method, path, params, read_delay=delay,
+            )
+        return request
@@ -0,0 +1,79 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from core.bench import use_default_sqlite
+from core.storage import COMPRESSIBLE
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает байты, которые уходят клиенту за страницы лент и '
+        'статику, без сжатия и со сжатием.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite с данными вместо базы по умолчанию.',
+        )
+
+    def handle(self, *args, **options):
+        if options['sqlite_path']:
+            use_default_sqlite(options['sqlite_path'])
+        post = Post.objects.exclude(group=None).select_related(
+            'author', 'group').order_by('-pk').first()
+        if post is None:
+            raise CommandError('В базе нет постов с группой.')
+        pages = {
+            'index': reverse('posts:index'),
+            'group_posts': reverse('posts:group_list', args=[post.group.slug]),
+            'profile': reverse('posts:profile', args=[post.author.username]),
+            'post_detail': reverse('posts:post_detail', args=[post.pk]),
+            'feed_rss': reverse('posts:feed', args=['rss']),
+            'feed_json': reverse('posts:feed', args=['json']),
+        }
+        client = Client()
+        report = {'pages': {}, 'static': self.static_sizes()}
+        for name, url in pages.items():
+            plain = client.get(url)
+            packed = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            report['pages'][name] = {
+                'plain_bytes': len(plain.content),
+                'gzip_bytes': len(packed.content),
+                'encoding': packed.get('Content-Encoding', ''),
+            }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def static_sizes(self):
+        """Размер статики из манифеста collectstatic и её .gz/.br копий."""
+        totals = {'files': 0, 'plain_bytes': 0, 'gzip_bytes': 0,
+                  'brotli_bytes': 0}
+        manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+        if not os.path.exists(manifest):
+            return totals
+        with open(manifest, encoding='utf-8') as source:
+            names = json.load(source)['paths'].values()
+        for name in names:
+            path = os.path.join(settings.STATIC_ROOT, name)
+            if not name.endswith(COMPRESSIBLE) or not os.path.exists(path):
+                continue
+            size = os.path.getsize(path)
+            totals['files'] += 1
+            totals['plain_bytes'] += size
+            for suffix, key in (('.gz', 'gzip_bytes'),
+                                ('.br', 'brotli_bytes')):
+                packed = path + suffix
+                totals[key] += (
+                    os.path.getsize(packed) if os.path.exists(packed)
+                    else size
+                )
+        return totals
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import loadtest
+from core.bench import seed_dataset, use_default_sqlite
+from posts.feed import rebuild_feeds
+
+READ_VIEWS = ('index', 'group_posts', 'profile')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает одновременные чтение лент и запись комментариев '
+        'без настроек производственного профиля БД и с ними.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite для набора данных (по умолчанию временный).',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20_000)
+        parser.add_argument('--comments', type=int, default=20_000)
+        parser.add_argument('--follows', type=int, default=5_000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждую страницу.')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Потоков на каждую ленту.')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Потоков, пишущих комментарии.')
+        parser.add_argument('--conn-max-age', type=int, default=600)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['sqlite_path']:
+            report = self.compare_profiles(options['sqlite_path'], options)
+        else:
+            # Временная база с набором данных удаляется после замера.
+            with tempfile.TemporaryDirectory() as directory:
+                report = self.compare_profiles(
+                    os.path.join(directory, 'profile.sqlite3'), options)
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def compare_profiles(self, path, options):
+        fresh = not os.path.exists(path)
+        use_default_sqlite(path)
+        try:
+            if fresh:
+                seed_dataset(
+                    DEFAULT_DB_ALIAS,
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows=options['follows'],
+                    seed=options['seed'],
+                    stdout=self.stderr,
+                )
+                rebuild_feeds()
+            scenarios = loadtest.build_scenarios()
+            app = get_wsgi_application()
+            cookies, token = loadtest.login_cookies()
+            jobs = [
+                (scenarios[name], options['requests'], options['readers'])
+                for name in READ_VIEWS
+            ]
+            jobs.append(
+                (scenarios['add_comment'], options['requests'],
+                 options['writers'])
+            )
+            report = {}
+            # Сначала без WAL: вернуть файл из WAL обратно можно, только
+            # когда к нему нет других соединений.
+            for profile in ('before', 'after'):
+                self.apply_profile(
+                    profile == 'after', options['conn_max_age'])
+                report[profile] = loadtest.run_mixed(
+                    app, jobs, cookies, token, seed=options['seed'],
+                )
+                self.stderr.write(f'{profile}: {report[profile]}')
+            return report
+        finally:
+            connections.close_all()
+
+    def apply_profile(self, production, conn_max_age):
+        """Переключает настройки соединений; действуют для новых потоков."""
+        connections.close_all()
+        database = connections.databases[DEFAULT_DB_ALIAS]
+        if production:
+            database['CONN_MAX_AGE'] = conn_max_age
+            settings.SQLITE_PRAGMAS = settings.PRODUCTION_SQLITE_PRAGMAS
+        else:
+            database['CONN_MAX_AGE'] = 0
+            settings.SQLITE_PRAGMAS = {}
+        settings.DB_HEALTH_CHECKS = production
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            if not production:
+                cursor.execute('PRAGMA journal_mode = DELETE')
+        connections[DEFAULT_DB_ALIAS].close()
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import statistics
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from posts.images import normalize_image
+from posts.thumbnails import THUMBNAIL_PRESETS
+
+
+def _timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер файла и время построения миниатюры для '
+        'исходного фото и для нормализованного при загрузке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы картинок; по умолчанию синтетическое фото.',
+        )
+        parser.add_argument('--width', type=int, default=6000)
+        parser.add_argument('--height', type=int, default=4000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        sources = {}
+        for path in options['paths']:
+            with open(path, 'rb') as source:
+                sources[os.path.basename(path)] = source.read()
+        if not sources:
+            sources['synthetic.jpg'] = self.synthetic(
+                options['width'], options['height'])
+        geometry, _ = THUMBNAIL_PRESETS['feed']
+        size = tuple(int(side) for side in geometry.split('x'))
+        report = {}
+        for name, data in sources.items():
+            upload = SimpleUploadedFile(name, data)
+            normalized, normalize_ms = _timed(
+                lambda: normalize_image(upload), options['repeat'])
+            normalized.seek(0)
+            result = normalized.read()
+            report[name] = {
+                'original_bytes': len(data),
+                'normalized_bytes': len(result),
+                'normalize_ms': normalize_ms,
+                'original': self.thumbnail_cost(
+                    data, size, options['repeat']),
+                'normalized': self.thumbnail_cost(
+                    result, size, options['repeat']),
+            }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def synthetic(self, width, height):
+        """Фото с шумом и EXIF, как снимок с телефона."""
+        image = Image.effect_noise((width, height), 32).convert('RGB')
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Phone'
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=95, exif=exif.tobytes())
+        return output.getvalue()
+
+    def thumbnail_cost(self, data, size, repeat):
+        """Время миниатюры, как у sorl с crop=center, и её исходный размер."""
+        def build():
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                decoded = image.size
+                ImageOps.fit(image, size, Image.LANCZOS)
+            return decoded
+
+        decoded, thumbnail_ms = _timed(build, repeat)
+        return {
+            'thumbnail_ms': thumbnail_ms,
+            'decoded_megapixels': round(decoded[0] * decoded[1] / 1e6, 1),
+        }
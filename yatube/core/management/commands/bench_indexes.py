@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.bench import measure, seed_dataset, use_sqlite_database
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов лент без составных индексов '
+        'и с ними на синтетическом наборе данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--database',
+            help='Алиас уже наполненной базы из settings.DATABASES.',
+        )
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite для набора данных (по умолчанию временный).',
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if using is not None:
+            report = self.compare(using, options)
+        elif options['sqlite_path']:
+            report = self.compare_sqlite(options['sqlite_path'], options)
+        else:
+            # Временная база с миллионом строк удаляется после замера.
+            with tempfile.TemporaryDirectory() as directory:
+                report = self.compare_sqlite(
+                    os.path.join(directory, 'bench.sqlite3'), options)
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        for name in report['before']:
+            before, after = report['before'][name], report['after'][name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  без индексов: {before["median_ms"]} мс')
+            self.stdout.write(f'    {before["plan"]}')
+            self.stdout.write(f'  с индексами:  {after["median_ms"]} мс')
+            self.stdout.write(f'    {after["plan"]}')
+
+    def compare_sqlite(self, path, options):
+        fresh = not os.path.exists(path)
+        using = use_sqlite_database(path)
+        try:
+            if fresh:
+                seed_dataset(
+                    using,
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows=0,
+                    stdout=self.stdout,
+                )
+            return self.compare(using, options)
+        finally:
+            connections[using].close()
+
+    def compare(self, using, options):
+        queries = self.queries(using)
+        report = {}
+        self.toggle_indexes(using, create=False)
+        try:
+            report['before'] = self.run(queries, options['repeat'])
+        finally:
+            # Индексы возвращаются, даже если замер прервали.
+            self.toggle_indexes(using, create=True)
+        report['after'] = self.run(queries, options['repeat'])
+        return report
+
+    def queries(self, using):
+        posts = Post.objects.using(using)
+        sample = posts.exclude(group=None).order_by('pk').first()
+        busiest = Comment.objects.using(using).values_list(
+            'post_id', flat=True).first()
+        return {
+            'index': posts.order_by('-pub_date', '-id')[:10],
+            'index_deep_page': posts.order_by('-pub_date', '-id')[
+                10000:10010],
+            'group_posts': posts.filter(group_id=sample.group_id).order_by(
+                '-pub_date', '-id')[:10],
+            'profile': posts.filter(author_id=sample.author_id).order_by(
+                '-pub_date', '-id')[:10],
+            'post_comments': Comment.objects.using(using).filter(
+                post_id=busiest).order_by('created'),
+        }
+
+    def toggle_indexes(self, using, create):
+        with connections[using].schema_editor() as editor:
+            for model in (Post, Comment):
+                for index in model._meta.indexes:
+                    if create:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+            elif connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE posts_post, posts_comment')
+
+    def run(self, queries, repeat):
+        return {
+            name: dict(
+                measure(lambda: list(queryset.all()), repeat),
+                plan=' | '.join(queryset.explain().splitlines()),
+            )
+            for name, queryset in queries.items()
+        }
@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from core.bench import percentiles
+
+# Прежний вариант навигации: ссылка на каждую страницу.
+FULL_RANGE = Template('''
+{% for i in page_obj.paginator.page_range %}
+  {% if page_obj.number == i %}
+    <li class="page-item active">
+      <span class="page-link">{{ i }}</span>
+    </li>
+  {% else %}
+    <li class="page-item">
+      <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+    </li>
+  {% endif %}
+{% endfor %}
+''')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время отрисовки и размер навигации по страницам '
+        'со ссылкой на каждую страницу и с окном вокруг текущей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, nargs='+', default=[1000, 50_000, 500_000],
+            help='Размеры ленты, для которых строится навигация.',
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        windowed = get_template('includes/paginator.html')
+        report = {}
+        for posts in options['posts']:
+            paginator = Paginator(range(posts), 10)
+            page_obj = paginator.page(paginator.num_pages // 2 or 1)
+            report[posts] = {
+                'full_range': self.measure(
+                    lambda: FULL_RANGE.render(Context({'page_obj': page_obj})),
+                    options['repeat'],
+                ),
+                'window': self.measure(
+                    lambda: windowed.render({'page_obj': page_obj}),
+                    options['repeat'],
+                ),
+            }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            html = render()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return dict(percentiles(timings), bytes=len(html.encode()))
@@ -0,0 +1,117 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core.bench import seed_dataset, use_default_sqlite
+from posts.feed import rebuild_feeds
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+MODES = {
+    'plain': LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', LOADERS)],
+    'cached_warmup': [('django.template.loaders.cached.Loader', LOADERS)],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку первого запроса к новому воркеру и время '
+        'повторной отрисовки без кэша шаблонов, с кэшем и с прогревом.'
+    )
+    # Шаблоны должны загружаться уже с настройками замера.
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite, который подменит базу по умолчанию; '
+                 'новый файл наполняется синтетическими данными.',
+        )
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Повторных запросов к каждой странице.')
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Новых процессов на каждый режим.')
+        parser.add_argument('--child', choices=MODES, help='Служебный.')
+
+    def handle(self, *args, **options):
+        path = options['sqlite_path']
+        if options['child']:
+            if path:
+                use_default_sqlite(path)
+            self.stdout.write(json.dumps(
+                self.measure(options['child'], options['repeat'])
+            ))
+            return
+        if path and not os.path.exists(path):
+            use_default_sqlite(path)
+            seed_dataset(DEFAULT_DB_ALIAS, users=100, groups=10,
+                         posts=2000, comments=2000, follows=500,
+                         stdout=self.stderr)
+            rebuild_feeds()
+        report = {}
+        for mode in MODES:
+            runs = [self.spawn(mode, options) for _ in range(options['runs'])]
+            report[mode] = {
+                metric: round(statistics.median(
+                    run[metric] for run in runs), 3)
+                for metric in runs[0]
+            }
+            self.stderr.write(f'{mode}: {report[mode]}')
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def spawn(self, mode, options):
+        command = [
+            sys.executable, sys.argv[0], 'bench_templates',
+            '--child', mode, '--repeat', str(options['repeat']),
+        ]
+        if options['sqlite_path']:
+            command += ['--sqlite-path', options['sqlite_path']]
+        output = subprocess.run(
+            command, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout
+        return json.loads(output.decode().strip().splitlines()[-1])
+
+    def measure(self, mode, repeat):
+        """Замер внутри нового процесса, пока шаблоны ещё не загружены."""
+        from django.test import Client
+        from django.urls import reverse
+
+        from core.warmup import warm_templates
+        from posts.models import Post
+
+        template = settings.TEMPLATES[0]
+        template.pop('APP_DIRS', None)
+        template['OPTIONS']['loaders'] = MODES[mode]
+        result = {'warmup_ms': 0}
+        if mode == 'cached_warmup':
+            started = time.perf_counter()
+            warm_templates()
+            result['warmup_ms'] = (time.perf_counter() - started) * 1000
+        post = Post.objects.order_by('pk').values_list('pk', flat=True)
+        pages = {'index': reverse('posts:index')}
+        if post:
+            pages['post_detail'] = reverse('posts:post_detail', args=[post[0]])
+        client = Client()
+        for name, url in pages.items():
+            started = time.perf_counter()
+            client.get(url)
+            result[f'{name}_first_ms'] = (
+                time.perf_counter() - started) * 1000
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            result[f'{name}_repeat_ms'] = statistics.median(timings)
+        return result
@@ -0,0 +1,116 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS
+
+from core import loadtest
+from core.bench import seed_dataset, use_default_sqlite
+from posts.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает главные страницы через WSGI-приложение и выводит '
+        'req/s, p50/p95/p99 и число запросов к БД в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sqlite-path',
+            help='Файл SQLite, который подменит базу по умолчанию; '
+                 'новый файл наполняется синтетическими данными.',
+        )
+        parser.add_argument('--seed-data', action='store_true',
+                            help='Наполнить текущую базу перед прогоном.')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50_000)
+        parser.add_argument('--comments', type=int, default=50_000)
+        parser.add_argument('--follows', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--views', nargs='+', metavar='VIEW',
+            help='Какие страницы нагружать (по умолчанию все).',
+        )
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждую страницу.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Запросов на прогрев перед замером.')
+        parser.add_argument('--output', help='Сохранить отчёт в файл.')
+        parser.add_argument('--baseline',
+                            help='Отчёт, с которым сравнить результат.')
+        parser.add_argument('--tolerance', type=float, default=10.0,
+                            help='Допустимое ухудшение, проценты.')
+
+    def handle(self, *args, **options):
+        self.prepare_database(options)
+        scenarios = self.select_scenarios(options['views'])
+        app = get_wsgi_application()
+        cookies, token = loadtest.login_cookies()
+        report = {}
+        for name, scenario in scenarios.items():
+            if options['warmup']:
+                loadtest.run_scenario(
+                    app, scenario, options['warmup'], 1, cookies, token,
+                    seed=options['seed'],
+                )
+            report[name] = loadtest.run_scenario(
+                app, scenario, options['requests'], options['concurrency'],
+                cookies, token, seed=options['seed'],
+            )
+            self.stderr.write(f'{name}: {report[name]}')
+        result = {'views': report}
+        if options['baseline']:
+            result['regressions'] = self.compare_with_baseline(
+                report, options['baseline'], options['tolerance'],
+            )
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text)
+        self.stdout.write(text)
+        if result.get('regressions'):
+            raise CommandError(
+                f'Найдено регрессий: {len(result["regressions"])}'
+            )
+
+    def prepare_database(self, options):
+        """Подменяет базу файлом SQLite и наполняет её, если нужно."""
+        seed = options['seed_data']
+        path = options['sqlite_path']
+        if path:
+            seed = seed or not os.path.exists(path)
+            use_default_sqlite(path)
+        if seed:
+            seed_dataset(
+                DEFAULT_DB_ALIAS,
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                seed=options['seed'],
+                stdout=self.stderr,
+            )
+            rebuild_feeds()
+
+    def select_scenarios(self, names):
+        try:
+            scenarios = loadtest.build_scenarios()
+        except ValueError as error:
+            raise CommandError(error)
+        names = names or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Неизвестные страницы: {sorted(unknown)}')
+        return {name: scenarios[name] for name in names}
+
+    def compare_with_baseline(self, report, path, tolerance):
+        with open(path, encoding='utf-8') as source:
+            baseline = json.load(source)
+        return loadtest.compare(
+            report, baseline.get('views', baseline), tolerance / 100,
+        )
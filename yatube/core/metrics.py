@@ -0,0 +1,159 @@
+"""Сбор показателей производительности запросов в памяти процесса."""
+import threading
+import time
+from collections import defaultdict
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Показатели одного запроса, попавшего в выборку."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+
+def current():
+    """Показатели текущего запроса или None, если он не в выборке."""
+    return getattr(_local, 'stats', None)
+
+
+def activate(stats):
+    _local.stats = stats
+
+
+def deactivate():
+    _local.stats = None
+
+
+def track_cache(hits=0, misses=0):
+    """Учитывает попадания и промахи кэша в текущем запросе."""
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def timed_render(render):
+    """Оборачивает Template.render, учитывая только внешний вызов."""
+    def wrapper(self, *args, **kwargs):
+        stats = current()
+        if stats is None:
+            return render(self, *args, **kwargs)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+class Registry:
+    """
+    Счётчики и гистограммы в формате Prometheus.
+
+    Данные живут в памяти процесса: при нескольких воркерах каждый
+    отдаёт на /metrics собственные значения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self.durations = defaultdict(float)
+            self.counts = defaultdict(int)
+            self.sampled = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, view, method, status, duration, stats=None):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            self.durations[view] += duration
+            self.counts[view] += 1
+            buckets = self.buckets[view]
+            for number, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[number] += 1
+            if stats is not None:
+                sampled = self.sampled[view]
+                sampled['requests'] += 1
+                sampled['sql_queries'] += stats.sql_count
+                sampled['sql_seconds'] += stats.sql_time
+                sampled['template_seconds'] += stats.template_time
+                sampled['cache_hits'] += stats.cache_hits
+                sampled['cache_misses'] += stats.cache_misses
+
+    def render(self):
+        lines = [
+            '# HELP yatube_requests_total Обработанные запросы.',
+            '# TYPE yatube_requests_total counter',
+        ]
+        with self.lock:
+            for (view, method, status), value in sorted(
+                    self.requests.items()):
+                lines.append(
+                    f'yatube_requests_total{{view="{view}",'
+                    f'method="{method}",status="{status}"}} {value}'
+                )
+            lines += [
+                '# HELP yatube_request_duration_seconds Время ответа.',
+                '# TYPE yatube_request_duration_seconds histogram',
+            ]
+            for view in sorted(self.counts):
+                for bound, value in zip(DURATION_BUCKETS, self.buckets[view]):
+                    lines.append(
+                        'yatube_request_duration_seconds_bucket'
+                        f'{{view="{view}",le="{bound}"}} {value}'
+                    )
+                lines += [
+                    'yatube_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="+Inf"}} {self.counts[view]}',
+                    'yatube_request_duration_seconds_sum'
+                    f'{{view="{view}"}} {self.durations[view]:.6f}',
+                    'yatube_request_duration_seconds_count'
+                    f'{{view="{view}"}} {self.counts[view]}',
+                ]
+            for name, description in (
+                ('requests', 'Запросы, попавшие в выборку.'),
+                ('sql_queries', 'Запросы к БД в выборке.'),
+                ('sql_seconds', 'Время запросов к БД в выборке.'),
+                ('template_seconds', 'Время отрисовки шаблонов в выборке.'),
+                ('cache_hits', 'Попадания в кэш в выборке.'),
+                ('cache_misses', 'Промахи кэша в выборке.'),
+            ):
+                metric = f'yatube_sampled_{name}_total'
+                lines += [
+                    f'# HELP {metric} {description}',
+                    f'# TYPE {metric} counter',
+                ]
+                for view in sorted(self.sampled):
+                    value = self.sampled[view][name]
+                    lines.append(f'{metric}{{view="{view}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,275 @@
+import json
+import logging
+import mimetypes
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.template.backends.django import Template
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from yatube import db_routers
+
+from . import metrics
+
+logger = logging.getLogger('yatube.performance')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/feed+json',
+    'application/rss+xml',
+    'application/atom+xml',
+    'application/xml',
+    'application/javascript',
+)
+PRECOMPRESSED = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+def accepts_encoding(request, encoding):
+    """Принимает ли клиент кодировку с учётом q-значений Accept-Encoding."""
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get('*', 0)) > 0
+
+
+def _install_template_timer():
+    if not getattr(Template.render, 'timed', False):
+        Template.render = metrics.timed_render(Template.render)
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет время ответа, запросы к БД, шаблоны и кэш по страницам.
+
+    Время ответа учитывается для всех запросов, подробные показатели —
+    только для доли PERF_SAMPLE_RATE, чтобы обёртки вокруг курсора
+    и шаблонов не замедляли основной поток. Template.render
+    подменяется только при PERF_TEMPLATE_TIMING. Для запросов из выборки
+    добавляется заголовок Server-Timing и пишется строка в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+        self.template_timing = getattr(
+            settings, 'PERF_TEMPLATE_TIMING', False)
+        if self.template_timing:
+            _install_template_timer()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        stats = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            stats = metrics.RequestStats()
+        if stats is None:
+            response = self.get_response(request)
+        else:
+            response = self._sampled(request, stats)
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.observe(
+            view, request.method, response.status_code, duration, stats
+        )
+        if stats is not None:
+            self._report(request, response, view, duration, stats)
+        return response
+
+    def _sampled(self, request, stats):
+        metrics.activate(stats)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.sql_wrapper)
+                    )
+                return self.get_response(request)
+        finally:
+            metrics.deactivate()
+
+    def _report(self, request, response, view, duration, stats):
+        template_ms = (
+            round(stats.template_time * 1000, 2)
+            if self.template_timing else None
+        )
+        if self.server_timing:
+            timings = [
+                f'app;dur={duration * 1000:.1f}',
+                f'db;dur={stats.sql_time * 1000:.1f};'
+                f'desc="{stats.sql_count} queries"',
+                f'cache;desc="hit={stats.cache_hits} '
+                f'miss={stats.cache_misses}"',
+            ]
+            if template_ms is not None:
+                timings.insert(2, f'tpl;dur={template_ms:.1f}')
+            response['Server-Timing'] = ', '.join(timings)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'sql_queries': stats.sql_count,
+            'sql_ms': round(stats.sql_time * 1000, 2),
+            'template_ms': template_ms,
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+        }))
+
+
+class ReplicaMiddleware:
+    """
+    Отправляет чтение страниц из REPLICA_VIEWS на реплику.
+
+    После запроса, меняющего данные (небезопасный метод или GET к
+    представлению из REPLICA_WRITE_VIEWS), браузер получает cookie, и
+    REPLICA_STICKY_SECONDS секунд все его запросы читают из основной
+    базы, чтобы пользователь сразу видел свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = set(getattr(settings, 'REPLICA_VIEWS', ()))
+        self.write_views = set(getattr(settings, 'REPLICA_WRITE_VIEWS', ()))
+        self.sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 0)
+        self.cookie = getattr(
+            settings, 'REPLICA_STICKY_COOKIE', 'yatube_primary'
+        )
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routers.read_from(None)
+        if self.sticky and self.writes(request):
+            response.set_cookie(
+                self.cookie, '1', max_age=self.sticky, httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def writes(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and match.view_name in self.write_views
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and request.resolver_match.view_name in self.views
+            and self.cookie not in request.COOKIES
+        ):
+            db_routers.read_from(db_routers.choose_replica())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжимает текстовые ответы от GZIP_MIN_LENGTH байт.
+
+    Потоковые ответы не сжимаются: gzip копил бы события SSE в
+    буфере, а выгрузки сжимаются сами по ?gzip=1. Страницы с CSRF-токеном
+    тоже не сжимаются: по размеру сжатого ответа с отражённым вводом
+    токен можно подобрать (BREACH).
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.min_length = getattr(settings, 'GZIP_MIN_LENGTH', 200)
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if (
+            response.streaming
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+            or len(response.content) < self.min_length
+            or request.META.get('CSRF_COOKIE_USED')
+        ):
+            return response
+        if not accepts_encoding(request, 'gzip'):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        return super().process_response(request, response)
+
+
+class StaticFilesMiddleware:
+    """
+    Отдаёт собранную статику из STATIC_ROOT.
+
+    Файлы с хэшем в имени браузер кэширует на STATIC_MAX_AGE секунд.
+    Если клиент принимает br или gzip и при сборке рядом со статикой
+    появилась сжатая копия, отдаётся она.
+    """
+
+    def __init__(self, get_response):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 0)
+        self.hashed = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values()
+        )
+
+    def __call__(self, request):
+        path = request.path_info
+        if not path.startswith(self.prefix) or request.method not in (
+                'GET', 'HEAD'):
+            return self.get_response(request)
+        name = path[len(self.prefix):]
+        try:
+            full_path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return self.get_response(request)
+        if not os.path.isfile(full_path):
+            return self.get_response(request)
+        stat = os.stat(full_path)
+        if not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                stat.st_mtime, stat.st_size):
+            return HttpResponseNotModified()
+        content_type = (
+            mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        )
+        encoding = None
+        for suffix, candidate in PRECOMPRESSED:
+            if accepts_encoding(request, candidate) and os.path.isfile(
+                    full_path + suffix):
+                full_path += suffix
+                encoding = candidate
+                break
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if name in self.hashed:
+            response['Cache-Control'] = (
+                f'public, max-age={self.max_age}, immutable'
+            )
+        else:
+            response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
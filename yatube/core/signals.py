@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    """
+    Закрывает постоянные соединения, которые перестали отвечать.
+
+    Django 2.2 проверяет соединение только после ошибки в запросе;
+    здесь оно проверяется перед каждым запросом, чтобы упавшая или
+    перезапущенная база не давала ошибку первому же посетителю.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for conn in connections.all():
+        if conn.connection is not None and not conn.is_usable():
+            conn.close()
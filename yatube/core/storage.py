@@ -0,0 +1,74 @@
+"""Хранилище статики с хэшами в именах и заранее сжатыми копиями."""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.html', '.txt', '.xml', '.json', '.map', '.ico',
+)
+MIN_SIZE = 256
+
+
+def compressors():
+    """Расширение сжатого файла и функция сжатия; .br — если есть brotli."""
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data)
+
+
+def compress_file(path):
+    """
+    Кладёт рядом с файлом его сжатые копии.
+
+    Копия не сохраняется, если она не меньше исходного файла.
+    Возвращает пути созданных файлов.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    created = []
+    for suffix, compress in compressors():
+        packed = compress(data)
+        if len(packed) >= len(data):
+            continue
+        with open(path + suffix, 'wb') as target:
+            target.write(packed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который после collectstatic сжимает
+    файлы с хэшами в gzip и brotli.
+
+    Ссылки на файлы, которых нет в манифесте, остаются без хэша,
+    а не роняют страницу.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, *args, **kwargs):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(
+                *args, **kwargs):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if kwargs.get('dry_run'):
+            return
+        for name in sorted(hashed):
+            path = self.path(name)
+            if name.endswith(COMPRESSIBLE) and (
+                    os.path.getsize(path) >= MIN_SIZE):
+                compress_file(path)
@@ -1,6 +1,11 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -27,3 +32,21 @@ def csrf_failure(request, reason=''):
         'core/403csrf.html',
         status=HTTPStatus.FORBIDDEN,
     )
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        scheme, _, value = request.META.get(
+            'HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme.lower() == 'bearer' and constant_time_compare(
+            value.strip(), token)
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    if not _metrics_allowed(request):
+        return HttpResponse(status=HTTPStatus.FORBIDDEN)
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
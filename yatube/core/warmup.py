@@ -0,0 +1,32 @@
+"""Подготовка воркера до первого запроса."""
+import os
+
+from django.template import engines
+
+
+def template_names(engine):
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(('.html', '.txt', '.xml')):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory).replace(
+                        os.sep, '/')
+
+
+def warm_templates():
+    """
+    Компилирует все шаблоны из каталогов TEMPLATES['DIRS'].
+
+    С кэширующим загрузчиком они остаются в памяти, и первый запрос
+    к воркеру не тратит время на разбор base.html и включаемых
+    шаблонов. Возвращает число шаблонов.
+    """
+    count = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for name in template_names(engine):
+            engine.get_template(name)
+            count += 1
+    return count
@@ -0,0 +1,88 @@
+import math
+import random
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.metrics import track_cache
+
+from . import thumbnails
+
+FRAGMENT_TIMEOUT = 60 * 60
+# Коэффициент вероятностного раннего обновления (XFetch): чем больше,
+# тем раньше до истечения срока фрагмент начинают пересчитывать.
+EARLY_REFRESH_BETA = 1.0
+POST_CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def fragment_key(post_id):
+    return f'post_fragment:{post_id}'
+
+
+def post_version(post):
+    """
+    Версия карточки: меняется при правке поста и при переименовании
+    автора или группы, которые показаны в карточке.
+    """
+    group = post.group
+    return '|'.join([
+        post.updated.isoformat(),
+        post.author.username,
+        group.slug if group else '',
+        group.title if group else '',
+    ])
+
+
+def _is_fresh(entry, version):
+    if not entry or entry['version'] != version:
+        return False
+    jitter = (
+        entry['delta'] * EARLY_REFRESH_BETA * math.log(1 - random.random())
+    )
+    return time.time() - jitter < entry['expiry']
+
+
+def attach_fragments(page_obj, template_name=POST_CARD_TEMPLATE):
+    """
+    Кладёт в post.fragment отрисованную карточку каждого поста страницы.
+
+    Карточки читаются из кэша одним get_many; отсутствующие, устаревшие
+    и выбранные для раннего обновления отрисовываются и сохраняются
+    одним set_many. Раннее обновление со случайным сдвигом не даёт
+    всем процессам одновременно пересчитывать истекающие карточки.
+    """
+    posts = list(page_obj.object_list)
+    page_obj.object_list = posts
+    keys = {post.pk: fragment_key(post.pk) for post in posts}
+    cached = cache.get_many(keys.values())
+    stale = []
+    for post in posts:
+        entry = cached.get(keys[post.pk])
+        if _is_fresh(entry, post_version(post)):
+            post.fragment = mark_safe(entry['html'])
+        else:
+            stale.append(post)
+    track_cache(hits=len(posts) - len(stale), misses=len(stale))
+    thumbnails.prefetch_thumbnails(stale)
+    rendered = {}
+    for post in stale:
+        version = post_version(post)
+        started = time.time()
+        html = render_to_string(template_name, {'post': post})
+        finished = time.time()
+        rendered[keys[post.pk]] = {
+            'version': version,
+            'html': html,
+            'delta': finished - started,
+            'expiry': finished + FRAGMENT_TIMEOUT,
+        }
+        post.fragment = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_TIMEOUT)
+    return page_obj
+
+
+def invalidate_post(post_id):
+    cache.delete(fragment_key(post_id))
@@ -0,0 +1,89 @@
+import hashlib
+
+from django.db.models import Exists, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+# Last-Modified не отдаётся: удаление поста или комментария не делает
+# страницу новее, и клиент с If-Modified-Since получал бы 304 со старым
+# содержимым. ETag строится из счётчиков и отметок posts_changed,
+# которые сигналы меняют при создании, правке и удалении постов, а
+# build_thumbnails — когда готовы миниатюры.
+
+
+def _last_change():
+    return Subquery(
+        AuthorStats.objects.order_by('-posts_changed')
+        .values('posts_changed')[:1]
+    )
+
+
+def _latest(queryset, *fields, **annotations):
+    """
+    Одним запросом берёт последний пост ленты и её счётчики.
+
+    Последний пост находится по индексу (…, -pub_date, -id).
+    """
+    return queryset.order_by('-pub_date', '-pk').annotate(
+        **annotations
+    ).values_list('pk', 'pub_date', *fields).first()
+
+
+def _etag(request, state):
+    user = request.user.pk if request.user.is_authenticated else None
+    return hashlib.md5(repr((user, state)).encode()).hexdigest()
+
+
+def index_etag(request):
+    # Последняя отметка среди авторов меняется при любом изменении
+    # постов, в том числе при удалении; она берётся по индексу.
+    return _etag(request, _latest(
+        Post.objects.all(), 'last_change', last_change=_last_change(),
+    ))
+
+
+def group_etag(request, slug):
+    return _etag(request, _latest(
+        Post.objects.filter(group__slug=slug),
+        'group__posts_count', 'group__posts_changed',
+    ))
+
+
+def profile_etag(request, username):
+    # Состояние берётся от автора, а не от его последнего поста: у автора
+    # без постов кнопка «Подписаться» тоже должна менять ETag.
+    return _etag(request, User.objects.filter(username=username).annotate(
+        last_post=Subquery(
+            Post.objects.filter(author=OuterRef('pk'))
+            .order_by('-pub_date', '-pk').values('pk')[:1]
+        ),
+        is_follower=Exists(Follow.objects.filter(
+            user=request.user.pk, author=OuterRef('pk')
+        )),
+    ).values_list(
+        'last_post', 'is_follower', 'stats__posts_count',
+        'stats__followers_count', 'stats__posts_changed',
+    ).first())
+
+
+def post_etag(request, post_id):
+    return _etag(request, Post.objects.filter(pk=post_id).annotate(
+        last_comment=Subquery(
+            Comment.objects.filter(post=OuterRef('pk')).order_by(
+                '-pk').values('pk')[:1]
+        ),
+    ).values_list(
+        'updated', 'last_comment', 'comments_count',
+        'author__stats__posts_count',
+    ).first())
+
+
+def conditional_view(compute):
+    """
+    Отвечает 304, если ETag у клиента актуален.
+
+    compute(request, **kwargs) возвращает ETag и вызывается до
+    отрисовки страницы.
+    """
+    return condition(etag_func=compute)
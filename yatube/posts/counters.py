@@ -0,0 +1,116 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .utils import count_key, drop_count, shift_count
+
+BATCH_SIZE = 1000
+
+
+def _change(queryset, field, delta, **values):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **values)
+
+
+def _change_author(author_id, field, delta, **values):
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta > 0:
+        _, created = AuthorStats.objects.get_or_create(
+            author_id=author_id, defaults={field: delta, **values}
+        )
+        if created:
+            return
+    _change(stats, field, delta, **values)
+
+
+def change_author_posts(author_id, delta):
+    _change_author(
+        author_id, 'posts_count', delta, posts_changed=timezone.now()
+    )
+
+
+def change_author_followers(author_id, delta):
+    _change_author(author_id, 'followers_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(
+            Group.objects.filter(pk=group_id), 'posts_count', delta,
+            posts_changed=timezone.now(),
+        )
+
+
+def touch_posts(author_id, group_id=None):
+    """Отмечает правку поста у автора и группы, не меняя счётчики."""
+    now = timezone.now()
+    AuthorStats.objects.filter(author_id=author_id).update(
+        posts_changed=now)
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(posts_changed=now)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_feed_counts(author_id, group_id, delta, moved_from=None):
+    """
+    Поправляет закэшированные количества постов в лентах.
+
+    Ленты подписок не поправляются: их слишком много у популярных
+    авторов, и они пересчитываются по истечении COUNT_TTL.
+    """
+    if delta:
+        shift_count(count_key('index'), delta)
+        shift_count(count_key('author', author_id), delta)
+    if moved_from is not None:
+        shift_count(count_key('group', moved_from), -1)
+    if group_id is not None:
+        shift_count(count_key('group', group_id), delta or 1)
+
+
+def drop_follow_count(user_id):
+    drop_count(count_key('follow', user_id))
+
+
+def _count_subquery(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(using=DEFAULT_DB_ALIAS):
+    """Пересчитывает все счётчики с нуля по данным таблиц."""
+    # Данные могли поменяться в обход сигналов, поэтому отметки
+    # posts_changed тоже обновляются, чтобы сменились ETag страниц.
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        Group.objects.using(using).update(
+            posts_count=_count_subquery(Post, 'group'), posts_changed=now)
+        Post.objects.using(using).update(
+            comments_count=_count_subquery(Comment, 'post'))
+        AuthorStats.objects.using(using).all().delete()
+        stats = {}
+        for model, counter in (
+            (Post, 'posts_count'),
+            (Follow, 'followers_count'),
+        ):
+            totals = model.objects.using(using).order_by().values(
+                'author').annotate(total=Count('pk'))
+            for row in totals.iterator():
+                stats.setdefault(row['author'], AuthorStats(
+                    author_id=row['author'], posts_changed=now,
+                ))
+                setattr(stats[row['author']], counter, row['total'])
+        AuthorStats.objects.using(using).bulk_create(
+            stats.values(), batch_size=BATCH_SIZE
+        )
@@ -0,0 +1,156 @@
+import csv
+import json
+import zlib
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+BATCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Модель, выгружаемые поля и поле для инкрементальной выгрузки.
+EXPORTS = {
+    'posts': (
+        Post,
+        ('id', 'text', 'pub_date', 'updated', 'author__username',
+         'group__slug', 'image'),
+        'updated',
+    ),
+    'comments': (
+        Comment,
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+        'created',
+    ),
+    'follows': (Follow, ('id', 'user__username', 'author__username'), None),
+    'groups': (Group, ('id', 'title', 'slug', 'description'), None),
+}
+
+
+FLAGS = {
+    '': True, '1': True, 'true': True, 'yes': True, 'on': True,
+    '0': False, 'false': False, 'no': False, 'off': False,
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_since(value):
+    """Дата или дата со временем в ISO-формате; наивные — в текущей зоне."""
+    try:
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        # Формат верный, но такой даты нет: 2024-02-30, 25:00.
+        moment = day = None
+    if moment is None:
+        if day is None:
+            raise ExportError(f'Некорректная дата: {value}')
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_flag(value):
+    """Флаг из параметра запроса: ?gzip, ?gzip=1 и ?gzip=0."""
+    try:
+        return FLAGS[value.strip().lower()]
+    except KeyError:
+        raise ExportError(f'Некорректное значение флага: {value}')
+
+
+def export_rows(name, since=None, batch_size=BATCH_SIZE):
+    """
+    Построчно отдаёт записи таблицы в виде кортежей.
+
+    Таблица читается пачками по первичному ключу (WHERE id > последний
+    LIMIT batch_size), поэтому память не зависит от размера таблицы,
+    а каждая пачка выбирается по индексу без OFFSET.
+    """
+    model, fields, since_field = EXPORTS[name]
+    queryset = model.objects.order_by('pk').values_list(*fields)
+    if since is not None:
+        queryset = queryset.filter(**{f'{since_field}__gte': since})
+    last_pk = 0
+    while True:
+        batch = queryset.filter(pk__gt=last_pk)[:batch_size]
+        count = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            count += 1
+            yield row
+        if count < batch_size:
+            return
+        last_pk = row[0]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def serialize(name, rows, fmt='ndjson'):
+    """Превращает кортежи в строки NDJSON или CSV с заголовком."""
+    fields = EXPORTS[name][1]
+    if fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(
+                dict(zip(fields, row)),
+                cls=DjangoJSONEncoder, ensure_ascii=False,
+            ) + '\n'
+    elif fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        raise ExportError(f'Неизвестный формат: {fmt}')
+
+
+def encode(lines, compress=False):
+    """Склеивает строки в куски по CHUNK_SIZE, при необходимости сжимая."""
+    compressor = (
+        zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    )
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_stream(name, fmt='ndjson', since=None, compress=False,
+                  batch_size=BATCH_SIZE):
+    if name not in EXPORTS:
+        raise ExportError(f'Неизвестная выгрузка: {name}')
+    if fmt not in FORMATS:
+        raise ExportError(f'Неизвестный формат: {fmt}')
+    if since is not None and EXPORTS[name][2] is None:
+        raise ExportError(f'Выгрузка {name} не поддерживает since')
+    rows = export_rows(name, since, batch_size)
+    return encode(serialize(name, rows, fmt), compress)
+
+
+def export_filename(name, fmt, compress=False):
+    return f'{name}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,149 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+# Посты авторов с таким числом подписчиков не раскладываются по лентам
+# при публикации, а подмешиваются в ленту при чтении.
+FANOUT_MAX_FOLLOWERS = 1000
+BACKFILL_LIMIT = 200
+BATCH_SIZE = 1000
+
+
+def is_prolific(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gte=FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def _store(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_prolific(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _store([
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    ])
+
+
+def _latest_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:BACKFILL_LIMIT])
+
+
+def _backfill(user_id, author_id, posts):
+    _store([
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    ])
+
+
+def backfill_feed(user_id, author_id):
+    """Переносит в ленту подписчика последние посты автора."""
+    if is_prolific(author_id):
+        return
+    _backfill(user_id, author_id, _latest_posts(author_id))
+
+
+def followers_changed(author_id, delta):
+    """
+    Раскладывает посты автора по лентам, когда число его подписчиков
+    опускается ниже FANOUT_MAX_FOLLOWERS.
+
+    Пока автор был выше порога, его посты не попадали в FeedEntry,
+    а новые подписчики не получали ленту автора; теперь они читаются
+    только из FeedEntry. При переходе порога вверх ничего делать
+    не нужно: посты автора подмешиваются при чтении, а старые записи
+    лент остаются верными.
+    """
+    if delta >= 0:
+        return
+    count = AuthorStats.objects.filter(author_id=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+    if not count < FANOUT_MAX_FOLLOWERS <= count - delta:
+        return
+    posts = _latest_posts(author_id)
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        _backfill(user_id, author_id, posts)
+
+
+def rebuild_feeds(using=DEFAULT_DB_ALIAS):
+    """
+    Заново раскладывает посты по лентам всех подписчиков.
+
+    Нужен после массовой загрузки через bulk_create, которая
+    не вызывает сигналы. Уже существующие записи пропускаются.
+    """
+    prolific = set(AuthorStats.objects.using(using).filter(
+        followers_count__gte=FANOUT_MAX_FOLLOWERS
+    ).values_list('author', flat=True))
+    follows = Follow.objects.using(using).values_list('user', 'author')
+    for user_id, author_id in follows.iterator():
+        if author_id in prolific:
+            continue
+        posts = Post.objects.using(using).filter(
+            author_id=author_id
+        ).order_by('-pub_date').values_list('pk', 'pub_date')
+        FeedEntry.objects.using(using).bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for post_id, pub_date in posts[:BACKFILL_LIMIT]
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def prune_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user):
+    """
+    Лента подписок пользователя.
+
+    Обычно это чтение диапазона индекса (user, -pub_date) таблицы
+    FeedEntry; посты авторов с большим числом подписчиков подмешиваются
+    отдельным условием.
+    """
+    prolific = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=FANOUT_MAX_FOLLOWERS,
+    ).values('author')
+    if not prolific.exists():
+        return Post.objects.filter(feed_entries__user=user).order_by(
+            '-feed_entries__pub_date'
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=prolific)
+    )
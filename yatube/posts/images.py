@@ -0,0 +1,87 @@
+"""Приведение загружаемых картинок к разумному размеру и формату."""
+import os
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+MAX_SIDE = 2048
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# Картинки меньше этого размера, без EXIF и не больше MAX_SIDE
+# сохраняются как есть: пересжатие не даст заметной экономии.
+KEEP_BELOW = 200 * 1024
+SPOOL_SIZE = 2 * 1024 * 1024
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def normalize_image(upload):
+    """
+    Уменьшает картинку до MAX_SIDE, поворачивает по EXIF, убирает
+    метаданные и пересохраняет в JPEG, а с прозрачностью — в WebP.
+
+    Большие загрузки Django держит во временном файле, и Pillow читает
+    их оттуда; JPEG сразу декодируется в уменьшенном масштабе, поэтому
+    фото в десятки мегапикселей не разворачивается в памяти целиком.
+    Результат пишется во временный файл, который уходит на диск, если
+    не помещается в SPOOL_SIZE. Анимация возвращается как есть.
+    """
+    upload.seek(0)
+    try:
+        output, fmt, extension = _convert(upload)
+    except (OSError, Image.DecompressionBombError):
+        # verify() не декодирует пиксели, и обрезанный файл всплывает
+        # только здесь.
+        raise ValidationError(
+            'Не удалось прочитать изображение: файл повреждён или '
+            'слишком велик.', code='invalid_image',
+        )
+    if output is None:
+        upload.seek(0)
+        return upload
+    size = output.tell()
+    output.seek(0)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return InMemoryUploadedFile(
+        output, 'image', f'{stem}.{extension}',
+        Image.MIME[fmt], size, None,
+    )
+
+
+def _convert(upload):
+    """Пересжатый файл, формат и расширение; (None, ...) — оставить."""
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False) or (
+        max(image.size) <= MAX_SIDE
+        and 'exif' not in image.info
+        and upload.size <= KEEP_BELOW
+    ):
+        return None, None, None
+    source_mode = image.mode
+    icc_profile = image.info.get('icc_profile')
+    image.draft(None, (MAX_SIDE, MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    if _has_alpha(image):
+        image = image.convert('RGBA')
+        fmt, extension, options = 'WEBP', 'webp', {
+            'quality': WEBP_QUALITY, 'method': 4,
+        }
+    else:
+        image = image.convert('RGB')
+        fmt, extension, options = 'JPEG', 'jpg', {
+            'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True,
+        }
+    # Профиль описывает цвета исходного режима: профиль CMYK в RGB-файле
+    # исказил бы цвета, поэтому при смене режима он отбрасывается.
+    if icc_profile and image.mode == source_mode:
+        options['icc_profile'] = icc_profile
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    image.save(output, fmt, **options)
+    return output, fmt, extension
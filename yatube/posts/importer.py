@@ -0,0 +1,246 @@
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BATCH_SIZE = 5000
+KINDS = ('posts', 'comments', 'follows')
+
+
+@contextmanager
+def manual_dates(model, *field_names):
+    """
+    Временно отключает auto_now_add у полей модели.
+
+    Нужен при массовой загрузке, когда даты приходят вместе с данными.
+    Флаг меняется у поля модели, то есть для всего процесса, поэтому
+    вызывать его можно только из команд управления, не из веб-запросов.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+class ImporterError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt='ndjson'):
+    """Построчно читает словари из NDJSON или CSV."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ImporterError(f'Неизвестный формат: {fmt}')
+
+
+def _value(row, *names):
+    # Принимаем и короткие имена колонок, и имена из выгрузки export_data.
+    for name in names:
+        if row.get(name) not in (None, ''):
+            return row[name]
+    return None
+
+
+def _moment(value):
+    if value is None:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ImporterError(f'Некорректная дата: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Importer:
+    """
+    Загружает посты, комментарии или подписки пачками через bulk_create.
+
+    Авторы и группы ищутся по словарям username -> id и slug -> id,
+    которые читаются один раз; недостающие создаются пачкой. Каждая
+    пачка вставляется в отдельной транзакции, поэтому при ошибке
+    уже вставленные пачки остаются в базе.
+    """
+
+    def __init__(self, kind, batch_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+        if kind not in KINDS:
+            raise ImporterError(f'Неизвестный тип данных: {kind}')
+        self.kind = kind
+        self.batch_size = batch_size
+        self.using = using
+        self.model = {
+            'posts': Post, 'comments': Comment, 'follows': Follow,
+        }[kind]
+        self.users = dict(
+            User.objects.using(using).values_list('username', 'pk')
+        )
+        self.groups = dict(
+            Group.objects.using(using).values_list('slug', 'pk')
+        )
+        self.imported = 0
+        self.skipped = 0
+        self.explicit_ids = False
+
+    def _resolve_users(self, names):
+        missing = {name for name in names if name and name not in self.users}
+        if missing:
+            User.objects.using(self.using).bulk_create(
+                User(username=name) for name in missing
+            )
+            self.users.update(User.objects.using(self.using).filter(
+                username__in=missing).values_list('username', 'pk'))
+
+    def _resolve_groups(self, slugs):
+        missing = {slug for slug in slugs if slug and slug not in self.groups}
+        if missing:
+            Group.objects.using(self.using).bulk_create(
+                Group(title=slug, slug=slug, description='')
+                for slug in missing
+            )
+            self.groups.update(Group.objects.using(self.using).filter(
+                slug__in=missing).values_list('slug', 'pk'))
+
+    def _build_posts(self, rows):
+        self._resolve_users(
+            _value(row, 'author', 'author__username') for row in rows
+        )
+        self._resolve_groups(
+            _value(row, 'group', 'group__slug') for row in rows
+        )
+        for row in rows:
+            author = _value(row, 'author', 'author__username')
+            if not author or not row.get('text'):
+                self.skipped += 1
+                continue
+            group = _value(row, 'group', 'group__slug')
+            yield Post(
+                id=_value(row, 'id'),
+                text=row['text'],
+                author_id=self.users[author],
+                group_id=self.groups[group] if group else None,
+                image=_value(row, 'image') or '',
+                pub_date=_moment(_value(row, 'pub_date')),
+            )
+
+    def _build_comments(self, rows):
+        self._resolve_users(
+            _value(row, 'author', 'author__username') for row in rows
+        )
+        post_ids = {_value(row, 'post', 'post_id') for row in rows}
+        existing = {
+            str(pk) for pk in Post.objects.using(self.using).filter(
+                pk__in=[pk for pk in post_ids if pk]
+            ).values_list('pk', flat=True)
+        }
+        for row in rows:
+            author = _value(row, 'author', 'author__username')
+            post_id = _value(row, 'post', 'post_id')
+            valid = author and row.get('text') and str(post_id) in existing
+            if not valid:
+                self.skipped += 1
+                continue
+            yield Comment(
+                id=_value(row, 'id'),
+                post_id=post_id,
+                author_id=self.users[author],
+                text=row['text'],
+                created=_moment(_value(row, 'created')),
+            )
+
+    def _build_follows(self, rows):
+        self._resolve_users(
+            name for row in rows for name in (
+                _value(row, 'user', 'user__username'),
+                _value(row, 'author', 'author__username'),
+            )
+        )
+        for row in rows:
+            user = _value(row, 'user', 'user__username')
+            author = _value(row, 'author', 'author__username')
+            if not user or not author or user == author:
+                self.skipped += 1
+                continue
+            yield Follow(
+                user_id=self.users[user], author_id=self.users[author]
+            )
+
+    def _new_objects(self, objects):
+        """
+        Отбрасывает строки с id, который уже есть в базе или в пачке.
+
+        Так повторная загрузка того же файла export_data пропускает уже
+        загруженные записи, а не падает на первичном ключе.
+        """
+        ids = {str(obj.pk) for obj in objects if obj.pk}
+        if not ids:
+            return objects
+        seen = {
+            str(pk) for pk in self.model.objects.using(self.using).filter(
+                pk__in=ids
+            ).values_list('pk', flat=True)
+        }
+        fresh = []
+        for obj in objects:
+            if obj.pk:
+                if str(obj.pk) in seen:
+                    self.skipped += 1
+                    continue
+                seen.add(str(obj.pk))
+            fresh.append(obj)
+        return fresh
+
+    def _insert(self, rows):
+        build = getattr(self, f'_build_{self.kind}')
+        with transaction.atomic(using=self.using):
+            objects = list(build(rows))
+            if self.kind != 'follows':
+                objects = self._new_objects(objects)
+            self.explicit_ids |= any(obj.pk for obj in objects)
+            self.model.objects.using(self.using).bulk_create(
+                objects, ignore_conflicts=self.kind == 'follows'
+            )
+        self.imported += len(objects)
+
+    def run(self, rows, progress=None):
+        """Загружает все строки; progress(imported) вызывается на пачку."""
+        rows = iter(rows)
+        with manual_dates(Post, 'pub_date'), manual_dates(
+                Comment, 'created'):
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._insert(batch)
+                if progress is not None:
+                    progress(self.imported)
+        if self.explicit_ids:
+            self._reset_sequence()
+        return self.imported
+
+    def _reset_sequence(self):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,210 @@
+"""
+Новые комментарии для читателей открытой страницы поста.
+
+Все читатели одного поста в процессе делят один канал. Проверка
+канала сверяет id последнего комментария в кэше (его пишет сигнал при
+сохранении) не чаще раза в POLL_INTERVAL и только при изменении
+забирает новые строки из БД — одним запросом на всех.
+
+Поток сервера читатель не держит. Под ASGI события ждёт цикл событий
+(astream), а в пул уходит только короткая проверка канала. Под WSGI
+ответ отдаёт накопившееся и сразу закрывается (stream), браузер
+переподключается через RETRY_MS.
+"""
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from .models import Comment
+
+POLL_INTERVAL = 1.0
+BUFFER_SIZE = 50
+# Отметка последнего комментария живёт недолго: с локальным кэшем
+# каждого процесса она не узнаёт о комментариях из других процессов.
+LAST_TIMEOUT = 10
+# Поток ASGI закрывается через STREAM_SECONDS, и браузер
+# переподключается с Last-Event-ID.
+STREAM_SECONDS = 30
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000
+
+_channels = {}
+_lock = threading.Lock()
+
+
+def last_key(post_id):
+    return f'live:last:{post_id}'
+
+
+def _serialize(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def fetch(post_id, after, limit=BUFFER_SIZE):
+    comments = Comment.objects.filter(
+        post_id=post_id, pk__gt=after
+    ).select_related('author').order_by('pk')[:limit]
+    return [_serialize(comment) for comment in comments]
+
+
+class Channel:
+    """
+    Буфер последних комментариев поста.
+
+    В буфере есть все комментарии с id больше floor; seen — id
+    последнего комментария, который видел канал.
+    """
+
+    def __init__(self, post_id):
+        self.post_id = post_id
+        self.condition = threading.Condition()
+        self.buffer = []
+        self.floor = self.seen = None
+        self.checked = 0
+        self.polling = False
+        self.dirty = False
+        self.watchers = 0
+
+    def _since(self, after):
+        return [entry for entry in self.buffer if entry['id'] > after]
+
+    def check(self, after):
+        """Комментарии с id больше after, не дольше одного запроса."""
+        with self.condition:
+            if self.floor is None:
+                self.floor = self.seen = after
+            floor = self.floor
+        if after < floor:
+            # Клиент отстал больше, чем помнит буфер.
+            found = fetch(self.post_id, after)
+            if found:
+                return found
+            after = floor
+        with self.condition:
+            found = self._since(after)
+            if found:
+                return found
+            if self.polling:
+                # Канал уже читает другой поток — ждём его результат.
+                while self.polling:
+                    self.condition.wait()
+                return self._since(after)
+            now = time.monotonic()
+            if not self.dirty and now < self.checked + POLL_INTERVAL:
+                return []
+            self.polling = True
+            self.dirty = False
+            self.checked = now
+        try:
+            self._poll()
+        finally:
+            with self.condition:
+                self.polling = False
+                self.condition.notify_all()
+        with self.condition:
+            return self._since(after)
+
+    def _poll(self):
+        seen = self.seen
+        last = cache.get(last_key(self.post_id))
+        if last is not None and last <= seen:
+            return
+        found = fetch(self.post_id, seen)
+        with self.condition:
+            if found:
+                self.buffer.extend(found)
+                self.seen = found[-1]['id']
+                if len(self.buffer) > BUFFER_SIZE:
+                    self.floor = self.buffer[-BUFFER_SIZE - 1]['id']
+                    del self.buffer[:-BUFFER_SIZE]
+        if last is None:
+            # add, а не set: publish мог уже записать более новый id.
+            cache.add(last_key(self.post_id), self.seen, LAST_TIMEOUT)
+
+    def wake(self):
+        with self.condition:
+            self.dirty = True
+            self.condition.notify_all()
+
+
+@contextmanager
+def watch(post_id):
+    """Канал поста, живой, пока его кто-то читает."""
+    with _lock:
+        channel = _channels.get(post_id)
+        if channel is None:
+            channel = _channels[post_id] = Channel(post_id)
+        channel.watchers += 1
+    try:
+        yield channel
+    finally:
+        with _lock:
+            channel.watchers -= 1
+            if not channel.watchers:
+                del _channels[post_id]
+
+
+def check_comments(post_id, after):
+    with watch(post_id) as channel:
+        return channel.check(after)
+
+
+def publish(comment):
+    """Сообщает ждущим читателям о новом комментарии."""
+    cache.set(last_key(comment.post_id), comment.pk, LAST_TIMEOUT)
+    with _lock:
+        channel = _channels.get(comment.post_id)
+    if channel is not None:
+        channel.wake()
+
+
+def _events(comments):
+    for comment in comments:
+        data = json.dumps(comment, ensure_ascii=False)
+        yield f'id: {comment["id"]}\nevent: comment\ndata: {data}\n\n'
+
+
+def stream(post_id, after):
+    """
+    События SSE для WSGI: комментарии новее after, которые уже есть.
+
+    Ответ закрывается сразу и не держит поток сервера; новые
+    комментарии браузер заберёт, переподключившись через RETRY_MS.
+    """
+    yield f'retry: {RETRY_MS}\n\n'
+    yield from _events(check_comments(post_id, after))
+
+
+async def astream(post_id, after, run_sync):
+    """
+    События SSE для ASGI в течение STREAM_SECONDS.
+
+    Ждёт в цикле событий; run_sync выполняет проверку канала в пуле.
+    """
+    yield f'retry: {RETRY_MS}\n\n'
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    quiet_since = loop.time()
+    with watch(post_id) as channel:
+        while loop.time() < deadline:
+            comments = await run_sync(channel.check, after)
+            if comments:
+                after = comments[-1]['id']
+                quiet_since = loop.time()
+                for event in _events(comments):
+                    yield event
+            elif loop.time() - quiet_since >= KEEPALIVE_SECONDS:
+                quiet_since = loop.time()
+                yield ': ping\n\n'
+            await asyncio.sleep(
+                min(POLL_INTERVAL, max(deadline - loop.time(), 0))
+            )
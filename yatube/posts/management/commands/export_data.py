@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии, подписки или группы '
+        'в NDJSON или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format', choices=sorted(export.FORMATS), default='ndjson'
+        )
+        parser.add_argument(
+            '--since',
+            help='Только записи, изменённые или созданные с этой даты.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать вывод в gzip.'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=export.BATCH_SIZE,
+            help='Сколько строк читать из БД за один запрос.',
+        )
+        parser.add_argument(
+            '--output', '-o', help='Файл для выгрузки, по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch'] < 1:
+            raise CommandError('--batch должен быть не меньше 1')
+        try:
+            since = options['since'] and export.parse_since(options['since'])
+            stream = export.export_stream(
+                options['name'], options['format'], since=since,
+                compress=options['gzip'], batch_size=options['batch'],
+            )
+        except export.ExportError as error:
+            raise CommandError(error)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                self._write(stream, output)
+        else:
+            self._write(stream, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+
+    def _write(self, stream, output):
+        for chunk in stream:
+            output.write(chunk)
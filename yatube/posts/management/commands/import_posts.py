@@ -0,0 +1,77 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import importer
+from posts.counters import rebuild_counters
+from posts.feed import rebuild_feeds
+from posts.thumbnails import enqueue_missing
+
+
+class Command(BaseCommand):
+    help = (
+        'Массово загружает посты, комментарии или подписки из NDJSON '
+        'или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с данными, «-» для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--kind', choices=importer.KINDS, default='posts'
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=importer.BATCH_SIZE,
+            help='Сколько строк вставлять одним запросом и транзакцией.',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики и ленты после загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        loader = importer.Importer(options['kind'], options['batch'])
+        started = time.monotonic()
+
+        def progress(imported):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Загружено {imported} строк')
+
+        try:
+            if path == '-':
+                loader.run(importer.read_rows(sys.stdin, fmt), progress)
+            else:
+                with open(path, encoding='utf-8', newline='') as stream:
+                    loader.run(importer.read_rows(stream, fmt), progress)
+        except (importer.ImporterError, ValueError) as error:
+            raise CommandError(error)
+        except DatabaseError as error:
+            raise CommandError(
+                f'{error}. Уже загружено {loader.imported} строк, '
+                'счётчики и ленты не пересчитаны; повторная загрузка '
+                'пропустит загруженные строки.'
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {loader.imported} строк, пропущено {loader.skipped} '
+            f'за {elapsed:.1f} с '
+            f'({loader.imported / max(elapsed, 1e-9):.0f} строк/с).'
+        ))
+        if options['skip_rebuild']:
+            return
+        rebuild_counters()
+        rebuild_feeds()
+        if options['kind'] == 'posts':
+            enqueue_missing()
+        self.stdout.write('Счётчики и ленты пересчитаны.')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Фоновый обработчик очереди миниатюр картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать очередь один раз и завершиться.',
+        )
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--enqueue-missing', action='store_true',
+            help='Поставить в очередь посты без готовых миниатюр.',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            queued = thumbnails.enqueue_missing()
+            self.stdout.write(f'Поставлено в очередь: {queued}')
+        while True:
+            processed = thumbnails.process_tasks(options['batch'])
+            if processed:
+                self.stdout.write(f'Обработано заданий: {processed}')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
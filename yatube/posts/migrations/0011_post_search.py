@@ -0,0 +1,64 @@
+from django.db import migrations
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+)
+# Выражение должно совпадать с тем, что строит SearchVector('text'),
+# иначе планировщик не возьмёт индекс.
+POSTGRESQL_FORWARD = (
+    "CREATE INDEX posts_post_text_search_idx ON posts_post USING GIN "
+    "(to_tsvector('russian'::regconfig, COALESCE(text, '')))",
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS posts_post_text_search_idx',
+)
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_thumbnailtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({
+                'sqlite': SQLITE_FORWARD,
+                'postgresql': POSTGRESQL_FORWARD,
+            }),
+            _run({
+                'sqlite': SQLITE_BACKWARD,
+                'postgresql': POSTGRESQL_BACKWARD,
+            }),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostThumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset', models.CharField(max_length=20, verbose_name='Размер')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходная картинка')),
+                ('data', models.TextField(verbose_name='Миниатюра')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ready_thumbnails', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'unique_together': {('post', 'preset')},
+            },
+        ),
+    ]
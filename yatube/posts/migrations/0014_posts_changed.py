@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_postthumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='posts_changed',
+            field=models.DateTimeField(db_index=True, null=True, verbose_name='Посты автора изменены'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_changed',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Посты группы изменены'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
 
 User = get_user_model()
 CONST_TEXT_CUT = 15
@@ -9,6 +9,16 @@ class Group(models.Model):
     title = models.CharField(verbose_name='Название группы', max_length=200)
     slug = models.SlugField(verbose_name='Слаг', max_length=200, unique=True)
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False,
+    )
+    posts_changed = models.DateTimeField(
+        verbose_name='Посты группы изменены',
+        null=True,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -17,6 +27,7 @@ class Group(models.Model):
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста')
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         verbose_name='Автор поста',
@@ -36,13 +47,69 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                name='posts_post_author_date_idx',
+                fields=['author', '-pub_date', '-id'],
+            ),
+            models.Index(
+                name='posts_post_group_date_idx',
+                fields=['group', '-pub_date', '-id'],
+            ),
+            models.Index(
+                name='posts_post_date_id_idx',
+                fields=['-pub_date', '-id'],
+            ),
+            models.Index(
+                name='posts_post_updated_idx',
+                fields=['-updated'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:CONST_TEXT_CUT]
 
+    def save(self, *args, **kwargs):
+        # Обработчики post_save пишут счётчики, ленты и очередь миниатюр;
+        # они сохраняются вместе с постом или не сохраняются вовсе.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+    )
+    posts_changed = models.DateTimeField(
+        verbose_name='Посты автора изменены',
+        null=True,
+        db_index=True,
+    )
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -65,6 +132,15 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        ordering = ('created',)
+        indexes = [
+            models.Index(
+                name='posts_comment_post_created_idx',
+                fields=['post', 'created'],
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.text[:CONST_TEXT_CUT]
 
@@ -91,3 +167,78 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, заранее разложенная по подписчикам."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='posts_feed_entry_unique',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='posts_feed_user_date_idx',
+                fields=['user', '-pub_date', '-post'],
+            ),
+            models.Index(
+                name='posts_feed_user_author_idx',
+                fields=['user', 'author'],
+            ),
+        ]
+
+
+class ThumbnailTask(models.Model):
+    """Задание на подготовку миниатюр картинки поста."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_tasks',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ('pk',)
+
+
+class PostThumbnail(models.Model):
+    """Готовая миниатюра картинки поста одного из размеров."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='ready_thumbnails',
+        verbose_name='Пост',
+    )
+    preset = models.CharField('Размер', max_length=20)
+    source = models.CharField('Исходная картинка', max_length=255)
+    data = models.TextField('Миниатюра')
+
+    class Meta:
+        unique_together = ('post', 'preset')
@@ -0,0 +1,51 @@
+from django.db import connections
+
+from .models import Post
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts_query(query):
+    """
+    Превращает пользовательский ввод в запрос FTS5.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 во вводе
+    не ломали запрос; последнее слово ищется и как префикс.
+    """
+    words = ['"{}"'.format(word.replace('"', '""')) for word in query.split()]
+    if words:
+        words[-1] += ' *'
+    return ' '.join(words)
+
+
+def search_posts(query, queryset=None):
+    """
+    Посты, подходящие под запрос, от самых релевантных.
+
+    SQLite ищет по таблице FTS5 и ранжирует по bm25, PostgreSQL —
+    по GIN-индексу на to_tsvector; на прочих базах остаётся LIKE.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return queryset.extra(
+            select={'rank': f'{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = posts_post.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[fts_query(query)],
+            order_by=['rank', '-pub_date'],
+        )
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('text', config=SEARCH_CONFIG)
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search=vector, rank=SearchRank(vector, search_query),
+        ).filter(search=search_query).order_by('-rank', '-pub_date')
+    return queryset.filter(text__icontains=query).order_by('-pub_date')
@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cache, counters, feed, live, syndication, thumbnails
+from .models import Comment, Follow, Group, Post
+
+
+def _loaded_image(instance):
+    if 'image' not in instance.__dict__:
+        return DEFERRED
+    return str(instance.__dict__['image'] or '')
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    # Поля, не загруженные через only()/defer(), помечаются DEFERRED:
+    # их прежнее значение неизвестно, и сравнивать с ним нельзя.
+    instance._loaded_group_id = instance.__dict__.get('group_id', DEFERRED)
+    instance._loaded_image = _loaded_image(instance)
+
+
+@receiver(pre_save, sender=Post)
+def load_deferred_group(sender, instance, raw, **kwargs):
+    """Группу назначили посту, загруженному без неё: читаем прежнюю."""
+    if (
+        instance._loaded_group_id is DEFERRED
+        and 'group_id' in instance.__dict__
+        and instance.pk is not None
+    ):
+        instance._loaded_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    old_group_id = instance._loaded_group_id
+    if old_group_id is DEFERRED:
+        # Группа не загружалась и не менялась.
+        old_group_id = instance.group_id
+    if created:
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+        counters.change_feed_counts(instance.author_id, instance.group_id, 1)
+        feed.fan_out_post(instance)
+    elif old_group_id != instance.group_id:
+        counters.change_group_posts(old_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+        counters.touch_posts(instance.author_id)
+        counters.change_feed_counts(
+            instance.author_id, instance.group_id, 0,
+            moved_from=old_group_id,
+        )
+    else:
+        counters.touch_posts(instance.author_id, instance.group_id)
+    syndication.post_saved(instance, old_group_id)
+    instance._loaded_group_id = instance.group_id
+    image = _loaded_image(instance)
+    if image is not DEFERRED and image and (
+        created or image != instance._loaded_image
+    ):
+        thumbnails.enqueue(instance)
+    instance._loaded_image = image
+    cache.invalidate_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+    counters.change_feed_counts(instance.author_id, instance.group_id, -1)
+    cache.invalidate_post(instance.pk)
+    syndication.post_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+        transaction.on_commit(lambda: live.publish(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def fill_follower_feed(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_followers(instance.author_id, 1)
+        counters.drop_follow_count(instance.user_id)
+        feed.backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follower_feed(sender, instance, **kwargs):
+    counters.change_author_followers(instance.author_id, -1)
+    counters.drop_follow_count(instance.user_id)
+    feed.prune_feed(instance.user_id, instance.author_id)
+    feed.followers_changed(instance.author_id, -1)
+
+
+@receiver(post_init, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+def _drop_group_feeds(*slugs):
+    for slug in set(slugs):
+        if slug:
+            syndication.drop_feed('group', slug)
+
+
+@receiver(post_save, sender=Group)
+def drop_group_feed(sender, instance, **kwargs):
+    # При смене слага сбрасывается и лента по старому адресу.
+    slugs = (instance._loaded_slug, instance.slug)
+    instance._loaded_slug = instance.slug
+    transaction.on_commit(lambda: _drop_group_feeds(*slugs))
+
+
+@receiver(post_delete, sender=Group)
+def drop_deleted_group_feed(sender, instance, **kwargs):
+    slug = instance.slug
+    transaction.on_commit(lambda: _drop_group_feeds(slug))
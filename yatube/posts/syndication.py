@@ -0,0 +1,227 @@
+import hashlib
+import json
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from django.template.defaultfilters import linebreaksbr, truncatewords
+from django.urls import reverse
+from django.utils import feedgenerator
+
+from .models import Group, Post
+
+User = get_user_model()
+
+FEED_SIZE = 20
+FEED_TIMEOUT = 24 * 60 * 60
+FORMATS = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+
+def _digest(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def feed_key(kind, key=''):
+    # Слаг и имя пользователя хэшируются: в ключах memcached нельзя
+    # использовать пробелы и не-ASCII символы.
+    return f'syndication:{kind}:{_digest(key)}'
+
+
+def _version_key(kind, key):
+    return f'{feed_key(kind, key)}:version'
+
+
+def _body_key(kind, key, version, fmt, base):
+    return (
+        f'syndication:body:{kind}:{_digest(key)}:{version}:{fmt}:'
+        f'{_digest(base)}'
+    )
+
+
+def _entry(post):
+    return {
+        'id': post.pk,
+        'title': truncatewords(post.text, 8),
+        'link': reverse('posts:post_detail', args=[post.pk]),
+        'text': post.text,
+        'author': post.author.username,
+        'pub_date': post.pub_date,
+        'updated': post.updated,
+    }
+
+
+def _meta(kind, key):
+    if kind == 'index':
+        return {
+            'title': 'Yatube — последние записи',
+            'link': reverse('posts:index'),
+            'description': 'Новые записи всех авторов Yatube',
+        }, Post.objects.all()
+    if kind == 'group':
+        group = Group.objects.filter(slug=key).first()
+        if group is None:
+            raise Http404
+        return {
+            'title': f'Yatube — {group.title}',
+            'link': reverse('posts:group_list', args=[group.slug]),
+            'description': group.description,
+        }, group.posts.all()
+    author = User.objects.filter(username=key).first()
+    if author is None:
+        raise Http404
+    return {
+        'title': f'Yatube — записи {author.username}',
+        'link': reverse('posts:profile', args=[author.username]),
+        'description': f'Новые записи автора {author.username}',
+    }, author.posts.all()
+
+
+def _current_version(kind, key):
+    version_key = _version_key(kind, key)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, FEED_TIMEOUT)
+        version = cache.get(version_key)
+    return version
+
+
+def load_feed(kind, key=''):
+    """
+    Метаданные и последние записи ленты.
+
+    Собираются из БД при промахе кэша и хранятся под текущей версией
+    ленты. Изменение постов не правит список на месте, а меняет версию
+    (drop_feed), поэтому список, собранный до изменения, записывается
+    под старой версией, и его больше никто не прочитает.
+    """
+    version = _current_version(kind, key)
+    state_key = f'{feed_key(kind, key)}:{version}'
+    state = cache.get(state_key)
+    if state is None:
+        meta, posts = _meta(kind, key)
+        posts = posts.select_related('author').order_by(
+            '-pub_date', '-pk')[:FEED_SIZE]
+        state = {
+            'meta': meta,
+            'entries': [_entry(post) for post in posts],
+        }
+        cache.set(state_key, state, FEED_TIMEOUT)
+    state['version'] = version
+    return state
+
+
+def drop_feed(kind, key=''):
+    """Сбрасывает ленту: следующий запрос соберёт её заново."""
+    cache.set(_version_key(kind, key), uuid.uuid4().hex, FEED_TIMEOUT)
+
+
+def _drop_feeds(username, group_slugs):
+    drop_feed('index')
+    if username:
+        drop_feed('author', username)
+    for slug in group_slugs:
+        if slug:
+            drop_feed('group', slug)
+
+
+def _group_slugs(*group_ids):
+    ids = {group_id for group_id in group_ids if group_id is not None}
+    if not ids:
+        return []
+    return list(Group.objects.filter(pk__in=ids).values_list(
+        'slug', flat=True))
+
+
+def post_saved(post, old_group_id):
+    """Сбрасывает ленты поста после фиксации транзакции."""
+    username = post.author.username
+    slugs = _group_slugs(old_group_id, post.group_id)
+    transaction.on_commit(lambda: _drop_feeds(username, slugs))
+
+
+def post_deleted(post):
+    username = User.objects.filter(pk=post.author_id).values_list(
+        'username', flat=True).first()
+    slugs = _group_slugs(post.group_id)
+    transaction.on_commit(lambda: _drop_feeds(username, slugs))
+
+
+def _absolute(base, link):
+    return base.rstrip('/') + link
+
+
+def _render_xml(state, fmt, base, feed_url):
+    generator = (
+        feedgenerator.Atom1Feed if fmt == 'atom'
+        else feedgenerator.Rss201rev2Feed
+    )
+    meta = state['meta']
+    feed = generator(
+        title=meta['title'],
+        link=_absolute(base, meta['link']),
+        description=meta['description'],
+        language='ru',
+        feed_url=feed_url,
+    )
+    for entry in state['entries']:
+        feed.add_item(
+            title=entry['title'],
+            link=_absolute(base, entry['link']),
+            description=linebreaksbr(entry['text']),
+            author_name=entry['author'],
+            pubdate=entry['pub_date'],
+            updateddate=entry['updated'],
+            unique_id=_absolute(base, entry['link']),
+        )
+    return feed.writeString('utf-8')
+
+
+def _render_json(state, base, feed_url):
+    meta = state['meta']
+    return json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': meta['title'],
+        'home_page_url': _absolute(base, meta['link']),
+        'feed_url': feed_url,
+        'description': meta['description'],
+        'language': 'ru',
+        'items': [
+            {
+                'id': _absolute(base, entry['link']),
+                'url': _absolute(base, entry['link']),
+                'title': entry['title'],
+                'content_text': entry['text'],
+                'date_published': entry['pub_date'].isoformat(),
+                'date_modified': entry['updated'].isoformat(),
+                'authors': [{'name': entry['author']}],
+            }
+            for entry in state['entries']
+        ],
+    }, ensure_ascii=False)
+
+
+def render_feed(request, kind, key, fmt):
+    """
+    Тело ленты в нужном формате и его версия для ETag.
+
+    Готовое тело хранится в кэше под версией списка записей, поэтому
+    отрисовывается один раз после каждого изменения ленты.
+    """
+    state = load_feed(kind, key)
+    base = request.build_absolute_uri('/')
+    body_key = _body_key(kind, key, state['version'], fmt, base)
+    body = cache.get(body_key)
+    if body is None:
+        feed_url = request.build_absolute_uri()
+        if fmt == 'json':
+            body = _render_json(state, base, feed_url)
+        else:
+            body = _render_xml(state, fmt, base, feed_url)
+        cache.set(body_key, body, FEED_TIMEOUT)
+    return body, state['version']
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.utils import page_window as window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj):
+    """Номера страниц вокруг текущей; None — место для многоточия."""
+    return window(page_obj)
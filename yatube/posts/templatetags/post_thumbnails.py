@@ -0,0 +1,14 @@
+from django import template
+
+from posts.thumbnails import ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, preset='feed'):
+    """Готовая миниатюра картинки или None, пока она строится в фоне."""
+    prefetched = getattr(post, 'thumbnails', {})
+    if preset in prefetched:
+        return prefetched[preset]
+    return ready_thumbnail(post, preset)
@@ -0,0 +1,60 @@
+import multiprocessing
+import shutil
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from yatube.cache_url import BACKENDS, cache_from_url
+
+
+def write_from_other_process(location, params):
+    FileBasedCache(location, params).set('shared_key', 'из другого процесса')
+
+
+class CacheUrlTests(SimpleTestCase):
+    def test_locmem_by_default(self):
+        '''locmem:// настраивает кэш в памяти процесса.'''
+        config = cache_from_url('locmem://', key_prefix='yatube', version=3)
+        self.assertEqual(config['BACKEND'], BACKENDS['locmem'])
+        self.assertEqual(config['KEY_PREFIX'], 'yatube')
+        self.assertEqual(config['VERSION'], 3)
+
+    def test_file_cache_with_options(self):
+        '''file:// задаёт каталог, таймаут и размер кэша.'''
+        config = cache_from_url(
+            'file:///var/cache/yatube?timeout=60&max_entries=500'
+        )
+        self.assertEqual(config['BACKEND'], BACKENDS['file'])
+        self.assertEqual(config['LOCATION'], '/var/cache/yatube')
+        self.assertEqual(config['TIMEOUT'], 60)
+        self.assertEqual(config['OPTIONS'], {'MAX_ENTRIES': 500})
+
+    def test_memcached_servers(self):
+        '''memcached:// принимает список серверов.'''
+        config = cache_from_url('memcached://10.0.0.1:11211,10.0.0.2:11211')
+        self.assertEqual(
+            config['LOCATION'], ['10.0.0.1:11211', '10.0.0.2:11211']
+        )
+
+    def test_unknown_scheme(self):
+        '''Неизвестная схема приводит к ошибке конфигурации.'''
+        with self.assertRaises(ImproperlyConfigured):
+            cache_from_url('mongo://localhost')
+
+    def test_file_cache_is_shared_between_processes(self):
+        '''Файловый кэш видит записи, сделанные другим процессом.'''
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        config = cache_from_url(f'file://{location}', key_prefix='yatube')
+        params = {'KEY_PREFIX': config['KEY_PREFIX']}
+        process = multiprocessing.Process(
+            target=write_from_other_process, args=(location, params)
+        )
+        process.start()
+        process.join()
+        self.assertEqual(
+            FileBasedCache(location, params).get('shared_key'),
+            'из другого процесса',
+        )
@@ -0,0 +1,99 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='exporter', is_staff=True)
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост №{number}')
+            for number in range(7)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ок')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def export(self, name, **params):
+        response = self.client.get(
+            reverse('posts:export_data', kwargs={'name': name}), params
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_export_in_batches(self):
+        '''Выгрузка читает таблицу пачками и отдаёт все строки.'''
+        with self.assertNumQueries(3):
+            call_command('export_data', 'posts', batch=3, output=os.devnull)
+        response = self.export('posts')
+        rows = [json.loads(line) for line in response.splitlines()]
+        self.assertEqual(
+            sorted(row['id'] for row in rows),
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+        )
+        self.assertEqual(rows[0]['author__username'], self.user.username)
+
+    def test_csv_gzip_export(self):
+        '''CSV можно получить сжатым на лету.'''
+        data = gzip.decompress(self.export('comments', format='csv', gzip=1))
+        rows = list(csv.reader(io.StringIO(data.decode())))
+        self.assertEqual(rows[0][:2], ['id', 'post_id'])
+        self.assertEqual(rows[1][1], str(self.post.pk))
+
+    def test_since_export(self):
+        '''Параметр since отбирает только новые изменения.'''
+        since = (timezone.now() + timedelta(days=1)).isoformat()
+        self.assertEqual(self.export('posts', since=since), b'')
+        response = self.client.get(
+            reverse('posts:export_data', kwargs={'name': 'groups'}),
+            {'since': since},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_invalid_params_rejected(self):
+        '''Несуществующая дата и флаг gzip=0 обрабатываются без ошибки.'''
+        url = reverse('posts:export_data', kwargs={'name': 'posts'})
+        for since in ('2024-02-30', '2024-01-01T25:00', 'вчера'):
+            with self.subTest(since=since):
+                response = self.client.get(url, {'since': since})
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'posts', since='2024-02-30',
+                         output=os.devnull)
+        for batch in (0, -5):
+            with self.subTest(batch=batch), self.assertRaises(CommandError):
+                call_command('export_data', 'posts', batch=batch,
+                             output=os.devnull)
+        response = self.export('posts', gzip=0)
+        self.assertEqual(json.loads(response.splitlines()[0])['text'][:4],
+                         'Пост')
+
+    def test_export_for_staff_only(self):
+        '''Выгрузка недоступна обычным пользователям.'''
+        user = User.objects.create(username='not_staff')
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse('posts:export_data', kwargs={'name': 'posts'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
@@ -1,14 +1,23 @@
+import io
 import shutil
 import tempfile
+import time
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageCms
+from sorl.thumbnail.images import ImageFile, serialize_image_file
 
 from posts.forms import PostForm
-from posts.models import Comment, Group, Post, User
+from posts.images import MAX_SIDE, normalize_image
+from posts.models import (Comment, Group, Post, PostThumbnail,
+                          ThumbnailTask, User)
+from posts.thumbnails import MAX_ATTEMPTS, process_tasks, ready_thumbnail
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -113,3 +122,126 @@ class PostFormTests(TestCase):
         self.assertRedirects(response, reverse('posts:post_detail',
                              kwargs={'post_id': self.post.id}))
         self.assertEqual(Comment.objects.count(), comments_count + 1)
+
+    def test_post_image_queued_for_thumbnails(self):
+        '''Картинка поста ставится в очередь миниатюр, до готовности
+        вместо неё показывается заглушка.'''
+        uploaded = SimpleUploadedFile(
+            name='queued.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(ThumbnailTask.objects.filter(post=post).exists())
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, 'img/placeholder.svg')
+        thumbnail = ImageFile('cache/ready.gif', default_storage)
+        thumbnail.set_size((600, 600))
+        with mock.patch('posts.thumbnails.get_thumbnail',
+                        return_value=thumbnail) as get_thumbnail:
+            self.assertEqual(process_tasks(), 1)
+        get_thumbnail.assert_called_once_with(
+            post.image, '600x600', crop='center', upscale=True
+        )
+        self.assertFalse(ThumbnailTask.objects.filter(post=post).exists())
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, 'cache/ready.gif')
+        self.assertNotContains(response, 'img/placeholder.svg')
+
+    def test_missing_thumbnail_cached_briefly(self):
+        '''Отсутствие миниатюры кэшируется ненадолго: запись другого
+        процесса видна без cache.delete.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост с картинкой', image='posts/pic.gif'
+        )
+        with mock.patch('posts.thumbnails.NOT_READY_TIMEOUT', 0.1):
+            self.assertIsNone(ready_thumbnail(post, 'feed'))
+        thumbnail = ImageFile('cache/ready.gif', default_storage)
+        thumbnail.set_size((600, 600))
+        PostThumbnail.objects.create(
+            post=post, preset='feed', source=str(post.image),
+            data=serialize_image_file(thumbnail),
+        )
+        time.sleep(0.2)
+        self.assertEqual(
+            ready_thumbnail(post, 'feed').name, 'cache/ready.gif')
+
+    def test_failed_thumbnail_task_dropped(self):
+        '''Задание, исчерпавшее попытки, убирается из очереди.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост с картинкой', image='posts/bad.gif'
+        )
+        ThumbnailTask.objects.filter(post=post).update(
+            attempts=MAX_ATTEMPTS - 1
+        )
+        with mock.patch('posts.thumbnails.get_thumbnail',
+                        side_effect=OSError), \
+                self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertEqual(process_tasks(), 1)
+        self.assertFalse(ThumbnailTask.objects.filter(post=post).exists())
+
+    def test_truncated_image_rejected(self):
+        '''Обрезанная картинка — ошибка формы, а не 500.'''
+        photo = io.BytesIO()
+        Image.new('RGB', (3000, 2000), (200, 100, 50)).save(photo, 'JPEG')
+        uploaded = SimpleUploadedFile(
+            name='broken.jpeg',
+            content=photo.getvalue()[:len(photo.getvalue()) // 2],
+            content_type='image/jpeg'
+        )
+        response = self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с битым фото', 'image': uploaded},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors.get('image'))
+        self.assertFalse(
+            Post.objects.filter(text='Пост с битым фото').exists())
+
+    def test_cmyk_profile_dropped(self):
+        '''Профиль CMYK не переносится в RGB-файл.'''
+        profile = ImageCms.ImageCmsProfile(
+            ImageCms.createProfile('sRGB')).tobytes()
+        photo = io.BytesIO()
+        Image.new('CMYK', (3000, 2000), (0, 50, 100, 0)).save(
+            photo, 'JPEG', icc_profile=profile)
+        result = normalize_image(SimpleUploadedFile(
+            name='print.jpeg', content=photo.getvalue(),
+            content_type='image/jpeg'
+        ))
+        with Image.open(result) as saved:
+            self.assertEqual(saved.mode, 'RGB')
+            self.assertNotIn('icc_profile', saved.info)
+
+    def test_post_image_normalized(self):
+        '''Большое фото уменьшается, поворачивается по EXIF и
+        сохраняется без метаданных.'''
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        photo = io.BytesIO()
+        Image.new('RGB', (3000, 2000), (200, 100, 50)).save(
+            photo, 'JPEG', quality=95, exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name='photo.jpeg',
+            content=photo.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фото', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с фото')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as saved:
+            self.assertEqual(max(saved.size), MAX_SIDE)
+            self.assertGreater(saved.height, saved.width)
+            self.assertNotIn('exif', saved.info)
@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def load(self, path, **options):
+        call_command('import_posts', path, stdout=io.StringIO(), **options)
+
+    def test_import_posts_in_batches(self):
+        '''Посты загружаются пачками с датами из файла.'''
+        path = self.write('posts.ndjson', (
+            {
+                'text': f'Пост №{number}',
+                'author': f'author_{number % 2}',
+                'group__slug': 'imported' if number % 3 else '',
+                'pub_date': f'2020-01-{number + 1:02d}T10:00:00',
+            }
+            for number in range(7)
+        ))
+        with self.assertNumQueries(15):
+            self.load(path, batch=3, skip_rebuild=True)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Group.objects.get().slug, 'imported')
+        first = Post.objects.order_by('pub_date').first()
+        self.assertEqual(first.text, 'Пост №0')
+        self.assertEqual(first.pub_date.year, 2020)
+
+    def test_import_comments_and_follows(self):
+        '''Комментарии и подписки загружаются, счётчики и ленты
+        пересчитываются.'''
+        author = User.objects.create(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        self.load(self.write('comments.ndjson', [
+            {'post_id': post.pk, 'author': 'reader', 'text': 'Ок'},
+            {'post_id': post.pk + 1000, 'author': 'reader', 'text': 'Нет'},
+        ]), kind='comments')
+        self.load(self.write('follows.ndjson', [
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'reader', 'author': 'author'},
+        ]), kind='follows')
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(Follow.objects.count(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=author).followers_count, 1
+        )
+        self.assertTrue(FeedEntry.objects.filter(
+            user__username='reader', post=post
+        ).exists())
+
+    def test_reimport_export_file(self):
+        '''Повторная загрузка выгрузки пропускает уже загруженные id.'''
+        author = User.objects.create(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        path = os.path.join(self.directory, 'posts.ndjson')
+        call_command('export_data', 'posts', output=path)
+        output = io.StringIO()
+        call_command('import_posts', path, stdout=output)
+        self.assertIn('Загружено 0 строк, пропущено 1', output.getvalue())
+        Post.objects.all().delete()
+        self.load(path)
+        self.load(path)
+        self.assertEqual(Post.objects.get().pk, post.pk)
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Group, Post
 
 User = get_user_model()
 
@@ -32,3 +35,84 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def test_post_counters_follow_create_edit_delete(self):
+        """Счётчики постов автора и группы обновляются."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.user.stats.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_group_counters_with_deferred_group(self):
+        """Пост, загруженный без группы, не сбивает счётчики групп."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        deferred = Post.objects.only('text').get(pk=post.pk)
+        deferred.text = 'Новый текст'
+        deferred.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        moved = Post.objects.defer('group').get(pk=post.pk)
+        moved.group = self.other_group
+        moved.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста обновляется."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_rebuild_counters_command(self):
+        """rebuild_counters пересчитывает счётчики после bulk_create."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}', group=self.group)
+            for number in range(3)
+        )
+        call_command('rebuild_counters', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, 3
+        )
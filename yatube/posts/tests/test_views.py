@@ -1,12 +1,26 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
+from django.utils.http import http_date
+from sorl.thumbnail.images import ImageFile
 
 from posts.models import Follow, Group, Post
 
-from ..models import Follow, Group, Post
+from .. import live
+from ..models import Comment, FeedEntry, Follow, Group, Post
+from ..thumbnails import build_thumbnails, prefetch_thumbnails
+from ..utils import (LOOKAHEAD_PAGES, CachedCountPaginator, count_key,
+                     page_window, shift_count)
 
 User = get_user_model()
 
@@ -207,6 +221,94 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), 5)
 
+    def test_group_posts_cursor_pages(self):
+        '''Курсорный пагинатор group_posts листает вперёд и назад.'''
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.guest_client.get(url + '?cursor=')
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        response = self.guest_client.get(
+            url + f'?cursor={first_page.next_cursor()}'
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        response = self.guest_client.get(
+            url + f'?cursor={second_page.previous_cursor()}'
+        )
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+
+    def test_broken_cursor_returns_first_page(self):
+        '''Некорректный курсор открывает первую страницу.'''
+        response = self.guest_client.get(reverse(
+            'posts:profile', kwargs={'username': self.user}) + '?cursor=abc'
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cached_count(self):
+        '''Количество постов ленты берётся из кэша и правится сигналами.'''
+        cache.clear()
+        key = count_key('index')
+        queryset = Post.objects.all()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                CachedCountPaginator(queryset, 10, key=key).count, 15)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(queryset, 10, key=key).count, 15)
+        Post.objects.create(author=self.user, text='Ещё один пост')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(queryset, 10, key=key).count, 16)
+        cache.clear()
+        with mock.patch('posts.utils.schedule_count_refresh') as refresh:
+            paginator = CachedCountPaginator(queryset, 2, key=key)
+            paginator.get_page(1)
+        self.assertEqual(paginator.count, 2 * (1 + LOOKAHEAD_PAGES) + 1)
+        refresh.assert_called_once()
+        cache.clear()
+
+    def test_concurrent_count_shifts(self):
+        '''Одновременные поправки количества не теряются.'''
+        cache.clear()
+        key = count_key('index')
+        queryset = Post.objects.all()
+        self.assertEqual(
+            CachedCountPaginator(queryset, 10, key=key).count, 15)
+
+        def shift():
+            for _ in range(200):
+                shift_count(key, 1)
+                shift_count(key, -1)
+                shift_count(key, 1)
+
+        threads = [threading.Thread(target=shift) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(queryset, 10, key=key).count, 1615)
+        cache.clear()
+
+    def test_page_window(self):
+        '''Навигация показывает края и окрестность текущей страницы.'''
+        paginator = Paginator(range(50_000), 10)
+        self.assertEqual(
+            page_window(paginator.page(100)),
+            [1, None, 98, 99, 100, 101, 102, None, 5000],
+        )
+        self.assertEqual(
+            page_window(paginator.page(4)),
+            [1, 2, 3, 4, 5, 6, None, 5000],
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'page=2')
+        self.assertNotContains(response, '&hellip;')
+
 
 class CacheViewTests(TestCase):
     @classmethod
@@ -223,20 +325,378 @@ class CacheViewTests(TestCase):
         self.client = Client()
         self.client.force_login(self.user)
 
-    def test_post_in_cache_first(self):
-        '''Тест кэша №1.'''
-        response_1 = self.client.get(reverse('posts:index')).content
-        Post.objects.all().delete
-        response_2 = self.client.get(reverse('posts:index')).content
-        self.assertEqual(response_1, response_2)
-
-    def test_post_in_cache_second(self):
-        '''Тест кэша №2.'''
-        response_1 = self.client.get(reverse('posts:index')).content
-        Post.objects.all().delete
+    def test_post_fragment_in_cache(self):
+        '''Карточка поста на главной берётся из кэша.'''
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый текст')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Изменённый текст')
+
+    def test_post_fragment_invalidated_on_save(self):
+        '''Сохранение поста сбрасывает его карточку в кэше.'''
+        self.client.get(reverse('posts:index'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст поста'
+        post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст поста')
+
+    def test_post_fragment_follows_author_rename(self):
+        '''Переименование автора обновляет закэшированную карточку.'''
+        self.client.get(reverse('posts:index'))
+        User.objects.filter(pk=self.user.pk).update(username='renamed')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Автор: renamed')
+
+    def test_index_pages_are_not_shared(self):
+        '''Разные страницы главной не отдают одно и то же содержимое.'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост #{number}')
+            for number in range(15)
+        )
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        second = self.client.get(
+            reverse('posts:index') + '?page=2').context['page_obj']
+        self.assertFalse(set(first) & set(second))
+
+    def test_thumbnails_prefetched_per_page(self):
+        '''Миниатюры страницы ищутся одним запросом, затем из кэша.'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Картинка #{number}',
+                 image=f'posts/picture_{number}.gif')
+            for number in range(5)
+        )
+        posts = list(Post.objects.exclude(image=''))
         cache.clear()
-        response_2 = self.client.get(reverse('posts:index')).content
-        self.assertNotEqual(response_1, response_2)
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts)
+        self.assertEqual(
+            [post.thumbnails['feed'] for post in posts], [None] * 5
+        )
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts)
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='post_author')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Прогулка по лесу, день {number}')
+            for number in range(12)
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Лес, лес и ещё раз лес',
+        )
+        Post.objects.create(author=cls.user, text='Море и горы')
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), dict(params, q=query)
+        ).context['page_obj']
+
+    def test_search_ranks_and_paginates(self):
+        '''Поиск находит посты по словам, ранжирует и делит на страницы.'''
+        first = self.search('ЛЕС')
+        self.assertEqual(first[0], self.post)
+        self.assertEqual(first.paginator.count, 13)
+        self.assertEqual(len(self.search('лес', page=2)), 3)
+        self.assertEqual(len(self.search('мор')), 1)
+        self.assertEqual(len(self.search('"пустыня" OR')), 0)
+
+    def test_search_index_follows_changes(self):
+        '''Изменённый и удалённый пост ищется по новому тексту.'''
+        post = Post.objects.create(author=self.user, text='Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(list(self.search('новый')), [post])
+        self.assertEqual(len(self.search('старый')), 0)
+        post.delete()
+        self.assertEqual(len(self.search('новый')), 0)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='post_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        )
+
+    def test_not_modified(self):
+        '''Повторный запрос с тем же ETag получает 304 за один запрос.'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes(self):
+        '''Правка поста, новый комментарий и удаление меняют ETag.'''
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.client.get(url)['ETag'], etags[url])
+        detail = self.urls[-1]
+        etag = self.client.get(detail)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Ок')
+        self.assertNotEqual(self.client.get(detail)['ETag'], etag)
+        Post.objects.create(author=self.user, text='Новый пост')
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls[:3]}
+        self.post.delete()
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.client.get(url)['ETag'], etags[url])
+
+    def test_deletion_not_hidden_by_if_modified_since(self):
+        '''Удаление поста не маскируется ответом 304 на If-Modified-Since.'''
+        older = Post.objects.create(
+            author=self.user, text='Старый пост', group=self.group,
+        )
+        Post.objects.filter(pk=older.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=1)
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertFalse(self.client.get(url).has_header(
+                    'Last-Modified'
+                ))
+        group_url = self.urls[1]
+        etag = self.client.get(group_url)['ETag']
+        older.delete()
+        response = self.client.get(
+            group_url,
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE=http_date(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Старый пост')
+
+    def test_thumbnail_ready_changes_etag(self):
+        '''Готовая миниатюра меняет ETag страниц с заглушкой.'''
+        post = Post.objects.get(text='Тестовый пост')
+        Post.objects.filter(pk=post.pk).update(image='posts/pic.gif')
+        post.refresh_from_db()
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        thumbnail = ImageFile('cache/ready.gif', default_storage)
+        thumbnail.set_size((600, 600))
+        with mock.patch('posts.thumbnails.get_thumbnail',
+                        return_value=thumbnail):
+            build_thumbnails(post)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_empty_profile_etag(self):
+        '''Подписка меняет ETag профиля даже у автора без постов.'''
+        author = User.objects.create(username='silent_author')
+        reader = User.objects.create(username='reader')
+        self.client.force_login(reader)
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        etag = self.client.get(url)['ETag']
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_etag_depends_on_user(self):
+        '''Гость и пользователь не получают чужую версию страницы.'''
+        etag = self.client.get(self.urls[0])['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class SyndicationTests(TransactionTestCase):
+    # Ленты сбрасываются в transaction.on_commit, поэтому изменения
+    # должны фиксироваться по-настоящему.
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='post_author')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Первый пост', group=self.group,
+        )
+
+    def get_feed(self, name, fmt, **kwargs):
+        return self.client.get(
+            reverse(name, kwargs=dict(kwargs, fmt=fmt))
+        )
+
+    def test_feed_formats(self):
+        '''Ленты отдаются в RSS, Atom и JSON Feed.'''
+        feeds = (
+            ('posts:feed', {}),
+            ('posts:group_feed', {'key': self.group.slug}),
+            ('posts:profile_feed', {'key': self.user.username}),
+        )
+        for name, kwargs in feeds:
+            for fmt, marker in (
+                ('rss', '<rss'), ('atom', '<feed'), ('json', '"items"'),
+            ):
+                with self.subTest(name=name, fmt=fmt):
+                    response = self.get_feed(name, fmt, **kwargs)
+                    self.assertContains(response, marker)
+                    self.assertContains(response, self.post.text)
+        response = self.get_feed('posts:group_feed', 'rss', key='missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.get_feed('posts:feed', 'xml').status_code, 404)
+
+    def test_feed_invalidated_on_commit(self):
+        '''Изменения постов сбрасывают ленты после фиксации.'''
+        etag = self.get_feed('posts:feed', 'rss')['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_feed('posts:feed', 'rss')
+        new_post = Post.objects.create(author=self.user, text='Свежий пост')
+        self.post.text = 'Исправленный пост'
+        self.post.group = None
+        self.post.save()
+        response = self.get_feed('posts:feed', 'rss')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, new_post.text)
+        self.assertContains(response, 'Исправленный пост')
+        with self.assertNumQueries(0):
+            self.get_feed('posts:feed', 'rss')
+        self.assertNotContains(
+            self.get_feed('posts:group_feed', 'json', key=self.group.slug),
+            'Исправленный пост',
+        )
+        new_post.delete()
+        self.assertNotContains(
+            self.get_feed('posts:feed', 'json'), new_post.text
+        )
+        response = self.client.get(
+            reverse('posts:feed', kwargs={'fmt': 'json'}),
+            HTTP_IF_NONE_MATCH=self.get_feed('posts:feed', 'json')['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_rolled_back_post_not_in_feed(self):
+        '''Пост из отменённой транзакции не попадает в ленту.'''
+        self.get_feed('posts:feed', 'rss')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Post.objects.create(author=self.user, text='Отменённый пост')
+            raise RuntimeError
+        self.assertNotContains(
+            self.get_feed('posts:feed', 'rss'), 'Отменённый пост'
+        )
+
+    def test_group_feed_dropped_with_group(self):
+        '''Удалённая или переименованная группа не отдаёт старую ленту.'''
+        url_key = {'key': self.group.slug}
+        self.assertContains(self.get_feed('posts:group_feed', 'rss',
+                                          **url_key), self.post.text)
+        self.group.slug = 'new-slug'
+        self.group.save()
+        response = self.get_feed('posts:group_feed', 'rss', **url_key)
+        self.assertEqual(response.status_code, 404)
+        self.get_feed('posts:group_feed', 'rss', key='new-slug')
+        self.group.delete()
+        response = self.get_feed('posts:group_feed', 'rss', key='new-slug')
+        self.assertEqual(response.status_code, 404)
+
+
+class LiveCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='commentator')
+        cls.post = Post.objects.create(author=cls.user, text='Горячий пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def stream(self, **params):
+        url = reverse('posts:comment_stream', args=[self.post.pk])
+        response = self.client.get(url, params)
+        if not response.streaming:
+            return response, ''
+        started = time.monotonic()
+        content = b''.join(response.streaming_content).decode()
+        # Под WSGI ответ не ждёт новых комментариев и не держит поток.
+        self.assertLess(time.monotonic() - started, 1)
+        return response, content
+
+    def test_stream_sends_new_comments(self):
+        '''Поток отдаёт только комментарии новее переданного id.'''
+        old = Comment.objects.create(
+            post=self.post, author=self.user, text='Старый')
+        new = Comment.objects.create(
+            post=self.post, author=self.user, text='Новый')
+        response, content = self.stream(after=old.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(f'id: {new.pk}\nevent: comment', content)
+        self.assertIn('Новый', content)
+        self.assertNotIn('Старый', content)
+        response, content = self.stream()
+        self.assertNotIn('event: comment', content)
+        self.assertEqual(self.stream(after='x')[0].status_code, 400)
+        response = self.client.get(
+            reverse('posts:comment_stream', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_poll_keeps_newer_marker(self):
+        '''Опрос не затирает отметку, записанную publish во время него.'''
+        key = live.last_key(self.post.pk)
+        comment = {'id': 1, 'author': 'a', 'text': 'b', 'created': ''}
+
+        def fetch_while_published(post_id, after):
+            cache.set(key, 999)
+            return [comment]
+
+        with mock.patch('posts.live.fetch',
+                        side_effect=fetch_while_published):
+            self.assertEqual(live.check_comments(self.post.pk, 0), [comment])
+        self.assertEqual(cache.get(key), 999)
+
+    def test_watchers_share_one_poll(self):
+        '''Читатели одного поста ждут общий запрос к БД.'''
+        comment = {'id': 1, 'author': 'a', 'text': 'b', 'created': ''}
+
+        def slow_fetch(post_id, after):
+            time.sleep(0.2)
+            return [comment]
+
+        results = []
+        with mock.patch('posts.live.fetch', side_effect=slow_fetch) as fetch:
+            threads = [
+                threading.Thread(target=lambda: results.append(
+                    live.check_comments(self.post.pk, 0)))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(results, [[comment]] * 5)
 
 
 class FollowTests(TestCase):
@@ -314,3 +774,47 @@ class FollowTests(TestCase):
             reverse('posts:follow_index')
         )
         self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_new_post_fanned_out_to_follower_feed(self):
+        '''Новая запись автора раскладывается в ленты подписчиков.'''
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        post = Post.objects.create(author=self.user_following, text='Новый')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_follower, post=post).exists())
+        Follow.objects.filter(user=self.user_follower).delete()
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.user_follower).exists())
+
+    @mock.patch('posts.feed.FANOUT_MAX_FOLLOWERS', 1)
+    def test_prolific_author_posts_read_at_request_time(self):
+        '''Посты автора с множеством подписчиков читаются при запросе.'''
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        Post.objects.create(author=self.user_following, text='Новый')
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.user_follower).exists())
+        response = self.authorized_client_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    @mock.patch('posts.feed.FANOUT_MAX_FOLLOWERS', 2)
+    def test_author_dropping_below_threshold_fanned_out(self):
+        '''
+        Посты, опубликованные, пока у автора было много подписчиков,
+        остаются в лентах, когда подписчиков становится меньше.
+        '''
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        Follow.objects.create(user=self.user_not_follower,
+                              author=self.user_following)
+        post = Post.objects.create(author=self.user_following, text='Новый')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=self.user_not_follower).delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_follower, post=post).exists())
+        response = self.authorized_client_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertIn(post, response.context['page_obj'])
@@ -0,0 +1,184 @@
+import logging
+
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import deserialize_image_file, serialize_image_file
+
+from core.metrics import track_cache
+
+from . import cache
+from .counters import touch_posts
+from .models import Post, PostThumbnail, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+# Все размеры миниатюр, которые используют шаблоны. Фоновая обработка
+# строит каждый из них, шаблоны обращаются к ним по имени.
+THUMBNAIL_PRESETS = {
+    'feed': ('600x600', {'crop': 'center', 'upscale': True}),
+}
+MAX_ATTEMPTS = 3
+THUMBNAIL_TIMEOUT = 24 * 60 * 60
+# Так в кэше запоминается, что готовой миниатюры нет. Запись живёт
+# недолго: обработчик очереди — отдельный процесс, и его cache.delete
+# не доходит до локального кэша веб-воркеров.
+NOT_READY = ('', '')
+NOT_READY_TIMEOUT = 5
+
+
+def thumbnail_key(post_id, preset):
+    return f'thumbnail:{post_id}:{preset}'
+
+
+def _lookup(posts, preset):
+    """
+    Готовые миниатюры постов: {post.pk: ImageFile или None}.
+
+    Один get_many к кэшу и не больше одного запроса к PostThumbnail.
+    Миниатюра, построенная для прежней картинки поста, не считается.
+    """
+    keys = {
+        post.pk: thumbnail_key(post.pk, preset)
+        for post in posts if post.image
+    }
+    found = default_cache.get_many(keys.values()) if keys else {}
+    missing = [pk for pk, key in keys.items() if key not in found]
+    if keys:
+        track_cache(hits=len(found), misses=len(missing))
+    if missing:
+        rows = {
+            post_id: (source, data)
+            for post_id, source, data in PostThumbnail.objects.filter(
+                post_id__in=missing, preset=preset,
+            ).values_list('post_id', 'source', 'data')
+        }
+        images = {post.pk: str(post.image) for post in posts}
+        built, pending = {}, {}
+        for pk in missing:
+            row = rows.get(pk, NOT_READY)
+            # Миниатюра прежней картинки тоже скоро перестроится.
+            target = built if row[0] == images[pk] else pending
+            target[keys[pk]] = row
+        default_cache.set_many(built, THUMBNAIL_TIMEOUT)
+        default_cache.set_many(pending, NOT_READY_TIMEOUT)
+        found.update(built)
+        found.update(pending)
+    ready = {}
+    for post in posts:
+        source, data = found.get(keys.get(post.pk), NOT_READY)
+        ready[post.pk] = (
+            deserialize_image_file(data)
+            if data and source == str(post.image) else None
+        )
+    return ready
+
+
+def ready_thumbnail(post, preset):
+    """Готовая миниатюра картинки поста или None; не создаёт её."""
+    if not post.image:
+        return None
+    return _lookup([post], preset)[post.pk]
+
+
+def prefetch_thumbnails(posts, preset='feed'):
+    """
+    Находит готовые миниатюры сразу для всех постов.
+
+    Результат кладётся в post.thumbnails[preset].
+    """
+    ready = _lookup(posts, preset)
+    for post in posts:
+        if not hasattr(post, 'thumbnails'):
+            post.thumbnails = {}
+        post.thumbnails[preset] = ready[post.pk]
+    return posts
+
+
+def prefetch_page_thumbnails(page_obj, preset='feed'):
+    page_obj.object_list = prefetch_thumbnails(
+        list(page_obj.object_list), preset
+    )
+    return page_obj
+
+
+def enqueue(post):
+    ThumbnailTask.objects.create(post=post)
+
+
+def build_thumbnails(post):
+    """Строит все размеры через sorl и запоминает готовые миниатюры."""
+    for preset, (geometry, options) in THUMBNAIL_PRESETS.items():
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        PostThumbnail.objects.update_or_create(
+            post=post, preset=preset, defaults={
+                'source': str(post.image),
+                'data': serialize_image_file(thumbnail),
+            },
+        )
+        default_cache.delete(thumbnail_key(post.pk, preset))
+    # Страницы с заглушкой вместо миниатюры должны получить новый ETag.
+    Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+    touch_posts(post.author_id, post.group_id)
+    cache.invalidate_post(post.pk)
+
+
+def process_tasks(limit=100):
+    """Строит миниатюры для очередной пачки заданий, возвращает их число."""
+    with transaction.atomic():
+        tasks = list(
+            ThumbnailTask.objects.select_for_update(skip_locked=True)
+            .filter(attempts__lt=MAX_ATTEMPTS)
+            .select_related('post')[:limit]
+        )
+        ThumbnailTask.objects.filter(
+            pk__in=[task.pk for task in tasks]
+        ).update(attempts=F('attempts') + 1)
+    done = []
+    for task in tasks:
+        try:
+            if task.post.image:
+                build_thumbnails(task.post)
+        except Exception:
+            logger.exception('Не удалось построить миниатюры поста %s',
+                             task.post_id)
+            continue
+        done.append(task.pk)
+    ThumbnailTask.objects.filter(pk__in=done).delete()
+    # Задания, исчерпавшие попытки, больше не выбираются; убираем их,
+    # чтобы очередь не росла. Пост можно вернуть в очередь через
+    # --enqueue-missing.
+    dead, _ = ThumbnailTask.objects.filter(
+        attempts__gte=MAX_ATTEMPTS
+    ).delete()
+    if dead:
+        logger.error('Сняты с очереди после %s попыток: %s заданий',
+                     MAX_ATTEMPTS, dead)
+    return len(tasks)
+
+
+def enqueue_missing():
+    """Ставит в очередь посты с картинками без готовых миниатюр."""
+    ready = (
+        PostThumbnail.objects.filter(
+            post=OuterRef('pk'),
+            source=OuterRef('image'),
+            preset__in=list(THUMBNAIL_PRESETS),
+        )
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    posts = Post.objects.exclude(image='').annotate(
+        ready=Coalesce(Subquery(ready, output_field=IntegerField()), 0)
+    ).filter(ready__lt=len(THUMBNAIL_PRESETS))
+    missing = [
+        ThumbnailTask(post_id=post_id)
+        for post_id in posts.values_list('pk', flat=True).iterator()
+    ]
+    ThumbnailTask.objects.bulk_create(missing, batch_size=1000)
+    return len(missing)
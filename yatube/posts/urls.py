@@ -8,7 +8,26 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('feed/<str:fmt>/', views.syndication_feed, name='feed'),
+    path(
+        'group/<slug:key>/feed/<str:fmt>/',
+        views.syndication_feed,
+        {'kind': 'group'},
+        name='group_feed',
+    ),
+    path(
+        'profile/<str:key>/feed/<str:fmt>/',
+        views.syndication_feed,
+        {'kind': 'author'},
+        name='profile_feed',
+    ),
+    path('search/', views.search, name='search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/live/',
+        views.comment_stream,
+        name='comment_stream',
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -27,4 +46,5 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow',
     ),
+    path('export/<str:name>/', views.export_data, name='export_data'),
 ]
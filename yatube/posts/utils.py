@@ -1,10 +1,368 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
 CONST_CUT = 10
+CURSOR_PARAM = 'cursor'
+COUNTER_THRESHOLD = 1000
+PAGE_WINDOW = 2
+# Количество объектов ленты считается свежим COUNT_TTL секунд, после
+# чего пересчитывается в фоне; устаревшее значение отдаётся ещё
+# COUNT_STALE_TIMEOUT секунд.
+COUNT_TTL = 60
+COUNT_STALE_TIMEOUT = 24 * 60 * 60
+COUNT_LOCK_TIMEOUT = 5 * 60
+LOOKAHEAD_PAGES = 3
+
+_refresher = None
+_refresher_lock = threading.Lock()
 
 
-def paginate(paginate_var, request):
-    paginator = Paginator(paginate_var, CONST_CUT)
+def paginate(paginate_var, request, count=None, allow_cursor=True,
+             count_key=None):
+    if allow_cursor and CURSOR_PARAM in request.GET:
+        paginator = CursorPaginator(paginate_var, CONST_CUT)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
+    if count_key is not None:
+        paginator = CachedCountPaginator(
+            paginate_var, CONST_CUT, count=count, key=count_key
+        )
+    else:
+        paginator = CountedPaginator(paginate_var, CONST_CUT, count=count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator, берущий количество объектов из денормализованного счётчика.
+
+    Для небольших выборок точный COUNT(*) дешёв, поэтому счётчик
+    используется только начиная с COUNTER_THRESHOLD.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None and (
+                self.known_count >= COUNTER_THRESHOLD):
+            return self.known_count
+        return super().count
+
+
+def count_key(feed, key=''):
+    return f'count:{feed}:{key}'
+
+
+def _shift_keys(key):
+    return f'{key}:added', f'{key}:removed'
+
+
+def shift_count(key, delta):
+    """
+    Поправляет закэшированное количество, не пересчитывая его.
+
+    Поправки копятся атомарным cache.incr в двух счётчиках, прибавленных
+    и убавленных (memcached не уменьшает счётчик ниже нуля), поэтому
+    одновременные записи не затирают друг друга.
+    """
+    if not delta:
+        return
+    shift_key = _shift_keys(key)[delta < 0]
+    cache.add(shift_key, 0, COUNT_STALE_TIMEOUT)
+    try:
+        cache.incr(shift_key, abs(delta))
+    except ValueError:
+        # Счётчик истёк между add и incr; количество пересчитается.
+        pass
+
+
+def load_count(key):
+    """
+    Закэшированное (количество, fresh_until, exact) или None и текущая
+    сумма поправок, которую надо сохранить вместе с новым количеством.
+    """
+    added, removed = _shift_keys(key)
+    found = cache.get_many([key, added, removed])
+    shift = found.get(added, 0) - found.get(removed, 0)
+    state = found.get(key)
+    if state is None or len(state) != 4:
+        return None, shift
+    value, fresh_until, exact, base = state
+    return (max(value + shift - base, 0), fresh_until, exact), shift
+
+
+def store_count(key, value, exact, shift):
+    cache.set(
+        key, (value, time.time() + COUNT_TTL, exact, shift),
+        COUNT_STALE_TIMEOUT,
+    )
+    # Поправки должны жить не меньше самого количества.
+    for shift_key in _shift_keys(key):
+        cache.touch(shift_key, COUNT_STALE_TIMEOUT)
+
+
+def drop_count(key):
+    cache.delete(key)
+
+
+def estimate_count(queryset):
+    """
+    Число строк таблицы по статистике БД или None.
+
+    Годится только для выборки без условий: статистика ничего не
+    знает о фильтрах. Для SQLite нужен выполненный ANALYZE.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        try:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table],
+                )
+            else:
+                return None
+        except DatabaseError:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    return int(str(row[0]).split()[0].split('.')[0])
+
+
+def _refresh_count(key, queryset):
+    try:
+        shift = load_count(key)[1]
+        store_count(key, queryset.count(), True, shift)
+    finally:
+        cache.delete(f'{key}:lock')
+        connections.close_all()
+
+
+def _get_refresher():
+    """
+    Поток фоновых пересчётов, созданный в этом процессе.
+
+    Поток создаётся при первом пересчёте и заново после fork: потоки
+    родителя (например, gunicorn --preload) в воркере не существуют.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None or _refresher[0] != os.getpid():
+            _refresher = os.getpid(), ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='count',
+            )
+        return _refresher[1]
+
+
+def schedule_count_refresh(key, queryset):
+    """Пересчитывает количество в фоне, не больше одного раза за раз."""
+    if cache.add(f'{key}:lock', 1, COUNT_LOCK_TIMEOUT):
+        _get_refresher().submit(_refresh_count, key, queryset.order_by())
+
+
+class CachedCountPaginator(CountedPaginator):
+    """
+    Paginator, берущий количество объектов ленты из кэша.
+
+    Устаревшее значение отдаётся сразу и пересчитывается в фоне. Если
+    в кэше ничего нет, считаются только строки до LOOKAHEAD_PAGES
+    страниц после запрошенной; если их больше, большие ленты берут
+    оценку из статистики БД, а точное число досчитывается в фоне.
+    """
+
+    def __init__(self, object_list, per_page, key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key = key
+        self.requested = 1
+
+    def get_page(self, number):
+        try:
+            self.requested = max(int(number), 1)
+        except (TypeError, ValueError):
+            self.requested = 1
+        return super().get_page(number)
+
+    def page(self, number):
+        # Количество может быть приблизительным, поэтому срез страницы
+        # не обрезается по нему, как в Paginator.page.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None and (
+                self.known_count >= COUNTER_THRESHOLD):
+            return self.known_count
+        state, shift = load_count(self.key)
+        # Запрос страницы за пределами известного количества — признак
+        # того, что оно устарело (например, после bulk_create).
+        if state is not None and (
+                (self.requested - 1) * self.per_page < state[0]
+                or self.requested == 1):
+            value, fresh_until, exact = state
+            if not exact or time.time() > fresh_until:
+                schedule_count_refresh(self.key, self.object_list)
+            return value
+        limit = (self.requested + LOOKAHEAD_PAGES) * self.per_page + 1
+        value = self.object_list.order_by()[:limit].count()
+        exact = value < limit
+        if not exact:
+            value = max(value, estimate_count(self.object_list) or 0)
+            schedule_count_refresh(self.key, self.object_list)
+        store_count(self.key, value, exact, shift)
+        return value
+
+
+def page_window(page_obj, window=PAGE_WINDOW):
+    """
+    Номера страниц для навигации: первая, последняя и window страниц
+    по обе стороны от текущей.
+
+    Пропуск между ними обозначается None. Длина списка не зависит от
+    числа страниц, поэтому навигация группы из тысяч страниц остаётся
+    короткой.
+    """
+    last = page_obj.paginator.num_pages
+    current = page_obj.number
+    numbers = sorted({
+        1, last,
+        *range(max(current - window, 1), min(current + window, last) + 1),
+    })
+    pages, previous = [], 0
+    for number in numbers:
+        if number - previous == 2:
+            pages.append(previous + 1)
+        elif number - previous > 2:
+            pages.append(None)
+        pages.append(number)
+        previous = number
+    return pages
+
+
+def encode_cursor(post, reverse=False):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен."""
+    payload = {'d': post.pub_date.isoformat(), 'i': post.pk}
+    if reverse:
+        payload['r'] = 1
+    return urlsafe_base64_encode(force_bytes(json.dumps(payload)))
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id, reverse) или None для битого токена."""
+    try:
+        payload = json.loads(force_str(urlsafe_base64_decode(token)))
+        pub_date = parse_datetime(payload['d'])
+        pk = int(payload['i'])
+    except (ValueError, TypeError, KeyError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk, bool(payload.get('r'))
+
+
+class CursorPaginator:
+    """
+    Постраничный вывод по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается одним запросом с LIMIT по индексу,
+    поэтому глубина страницы не влияет на время выборки.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._forward_page(self.object_list, has_previous=False)
+        pub_date, pk, reverse = cursor
+        if reverse:
+            return self._backward_page(pub_date, pk)
+        older = self.object_list.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+        return self._forward_page(older, has_previous=True)
+
+    def _forward_page(self, queryset, has_previous):
+        rows = list(
+            queryset.order_by('-pub_date', '-pk')[:self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, has_previous)
+
+    def _backward_page(self, pub_date, pk):
+        newer = self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        )
+        rows = list(newer.order_by('pub_date', 'pk')[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(rows, self, True, has_previous)
+
+
+class CursorPage(Sequence):
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(self.object_list[0], reverse=True)
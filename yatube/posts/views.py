@@ -1,24 +1,53 @@
+from functools import partial
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
 
+from . import export, live, syndication
+from .conditional import (conditional_view, group_etag, index_etag,
+                          post_etag, profile_etag)
+from .cache import attach_fragments
+from .feed import follow_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import paginate
+from .models import AuthorStats, Follow, Group, Post
+from .search import search_posts
+from .thumbnails import prefetch_page_thumbnails
+from .utils import count_key, paginate
 
 User = get_user_model()
 
 
+def author_posts_count(author):
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+@conditional_view(index_etag)
 def index(request):
-    page_obj = paginate(Post.objects.all(), request)
+    page_obj = attach_fragments(paginate(
+        Post.objects.select_related('author', 'group'), request,
+        count_key=count_key('index'),
+    ))
     context = {'page_obj': page_obj}
     return render(request, 'posts/index.html', context)
 
 
+@conditional_view(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    page_obj = paginate(group.posts.all(), request)
+    page_obj = prefetch_page_thumbnails(paginate(
+        group.posts.select_related('author'), request,
+        count=group.posts_count, count_key=count_key('group', group.pk),
+    ))
     context = {
         'group': group,
         'page_obj': page_obj
@@ -26,12 +55,19 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_view(profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author,).exists()
     profile = author
-    page_obj = paginate(author.posts.all(), request)
+    page_obj = prefetch_page_thumbnails(paginate(
+        author.posts.select_related('group'), request,
+        count=author_posts_count(author),
+        count_key=count_key('author', author.pk),
+    ))
     context = {
         'author': author,
         'following': following,
@@ -41,21 +77,80 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_view(post_etag)
 def post_detail(request, post_id):
-    post_id_detail = get_object_or_404(Post, pk=post_id)
+    post_id_detail = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments_list = post_id_detail.comments.all()
+    comments_list = list(post_id_detail.comments.select_related('author'))
     context = {
         'post': post_id_detail,
         'form': form,
         'comments': comments_list,
+        'last_comment_id': comments_list[-1].pk if comments_list else 0,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_stream(request, post_id):
+    """
+    Новые комментарии поста как server-sent events.
+
+    ASGIHandler отдаёт async_stream из цикла событий, WSGI-сервер —
+    короткий ответ stream.
+    """
+    last = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Max('comments__pk')
+    ).values_list('last_comment', flat=True)
+    if not last:
+        raise Http404
+    after = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('after')
+    try:
+        after = int(after) if after else last[0] or 0
+    except ValueError:
+        return HttpResponseBadRequest('after должен быть числом')
+    response = StreamingHttpResponse(
+        live.stream(post_id, after), content_type='text/event-stream'
+    )
+    response.async_stream = partial(live.astream, post_id, after)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def syndication_feed(request, fmt, kind='index', key=''):
+    if fmt not in syndication.FORMATS:
+        raise Http404
+    body, version = syndication.render_feed(request, kind, key, fmt)
+    etag = f'"{version}-{fmt}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = HttpResponse(body, content_type=syndication.FORMATS[fmt])
+    response['ETag'] = etag
+    return response
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        # Курсор по дате сбил бы порядок по релевантности.
+        page_obj = prefetch_page_thumbnails(paginate(
+            search_posts(query).select_related('author', 'group'),
+            request, allow_cursor=False,
+        ))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -103,8 +198,10 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    page_obj = paginate(Post.objects.filter(
-        author__following__user=request.user), request)
+    page_obj = attach_fragments(paginate(
+        follow_feed(request.user).select_related('author', 'group'),
+        request, count_key=count_key('follow', request.user.pk),
+    ))
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -124,3 +221,29 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=author)
+
+
+@staff_member_required
+def export_data(request, name):
+    if name not in export.EXPORTS:
+        raise Http404
+    fmt = request.GET.get('format', 'ndjson')
+    try:
+        compress = export.parse_flag(request.GET.get('gzip', '0'))
+        since = request.GET.get('since')
+        stream = export.export_stream(
+            name, fmt, since=since and export.parse_since(since),
+            compress=compress,
+        )
+    except export.ExportError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        stream,
+        content_type=(
+            'application/gzip' if compress else export.FORMATS[fmt]
+        ),
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        export.export_filename(name, fmt, compress)
+    )
+    return response
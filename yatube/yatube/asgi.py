@@ -0,0 +1,26 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 не поддерживает ASGI, поэтому запросы передаются обычному
+WSGI-обработчику через core.asgi.ASGIHandler. Запускать любым
+ASGI-сервером, например ``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+django.setup(set_prefix=False)
+
+from django.conf import settings  # noqa: E402
+
+from core.asgi import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
+
+if settings.TEMPLATE_WARMUP:
+    from core.warmup import warm_templates
+    warm_templates()
@@ -0,0 +1,107 @@
+"""Настройка CACHES из одной строки-URL (переменная YATUBE_CACHE_URL).
+
+Поддерживаемые схемы:
+
+* ``locmem://[имя]`` — память процесса, только для разработки и тестов;
+* ``file:///абсолютный/путь`` — общий для всех процессов одного сервера
+  кэш в файлах, не требует внешних сервисов;
+* ``memcached://host:port[,host:port]`` — pylibmc, если установлен,
+  иначе python-memcached;
+* ``redis://[:пароль@]host:port/db`` и ``rediss://`` — django-redis
+  с общим пулом соединений;
+* ``dummy://`` — кэш отключён.
+
+Параметры запроса: ``timeout`` (секунды), ``max_connections`` (размер
+пула соединений для Redis), ``max_entries`` (для locmem и file).
+"""
+import importlib.util
+from urllib.parse import parse_qs, urlparse
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'pylibmc': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+DEFAULT_MAX_CONNECTIONS = 50
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def _local(parsed, query):
+    if parsed.scheme == 'file':
+        if not parsed.path:
+            raise ImproperlyConfigured(
+                'Укажите каталог кэша: file:///путь/к/каталогу'
+            )
+        location = parsed.path
+    else:
+        location = parsed.netloc or parsed.path.strip('/')
+    config = {'BACKEND': BACKENDS[parsed.scheme], 'LOCATION': location}
+    if 'max_entries' in query:
+        config['OPTIONS'] = {'MAX_ENTRIES': int(query['max_entries'])}
+    return config
+
+
+def _dummy(parsed, query):
+    return {'BACKEND': BACKENDS['dummy']}
+
+
+def _memcached(parsed, query):
+    pylibmc = _installed('pylibmc')
+    config = {
+        'BACKEND': BACKENDS['pylibmc' if pylibmc else 'memcached'],
+        'LOCATION': parsed.netloc.split(','),
+    }
+    if pylibmc:
+        config['OPTIONS'] = {
+            'binary': True,
+            'behaviors': {'tcp_nodelay': True, 'ketama': True},
+        }
+    return config
+
+
+def _redis(parsed, query):
+    if not _installed('django_redis'):
+        raise ImproperlyConfigured(
+            'Для кэша в Redis установите пакет django-redis.'
+        )
+    return {
+        'BACKEND': BACKENDS['redis'],
+        'LOCATION': parsed._replace(query='').geturl(),
+        'OPTIONS': {
+            'CONNECTION_POOL_KWARGS': {
+                'max_connections': int(
+                    query.get('max_connections', DEFAULT_MAX_CONNECTIONS)
+                ),
+            },
+        },
+    }
+
+
+SCHEMES = {
+    'locmem': _local,
+    'file': _local,
+    'dummy': _dummy,
+    'memcached': _memcached,
+    'redis': _redis,
+    'rediss': _redis,
+}
+
+
+def cache_from_url(url, key_prefix='', version=1):
+    parsed = urlparse(url)
+    if parsed.scheme not in SCHEMES:
+        raise ImproperlyConfigured(f'Неизвестная схема кэша: {url}')
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    config = {'KEY_PREFIX': key_prefix, 'VERSION': version}
+    if 'timeout' in query:
+        config['TIMEOUT'] = int(query['timeout'])
+    config.update(SCHEMES[parsed.scheme](parsed, query))
+    return config
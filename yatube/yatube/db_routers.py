@@ -0,0 +1,61 @@
+"""Чтение с реплик для страниц, которые ничего не пишут.
+
+По умолчанию все запросы идут в основную базу. ReplicaMiddleware
+разрешает чтение с реплики только на время обработки страниц из
+settings.REPLICA_VIEWS и только если пользователь недавно ничего
+не записывал. Записи всегда идут в основную базу.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def read_from(alias):
+    """Направляет чтение текущего потока в alias (None — в основную)."""
+    _state.alias = alias
+
+
+def current_read_alias():
+    return getattr(_state, 'alias', None)
+
+
+def choose_replica():
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    return random.choice(replicas) if replicas else None
+
+
+def _pool():
+    return {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+
+
+def _pinned(hints):
+    """База объекта из подсказки, если это отдельная база, а не реплика."""
+    instance = hints.get('instance')
+    if instance is None or instance._state.db in _pool():
+        return None
+    return instance._state.db
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return (
+            _pinned(hints) or current_read_alias() or DEFAULT_DB_ALIAS
+        )
+
+    def db_for_write(self, model, **hints):
+        return _pinned(hints) or DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = _pool()
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными через репликацию.
+        return db not in getattr(settings, 'DATABASE_REPLICAS', ())
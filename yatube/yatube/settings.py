@@ -11,6 +11,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
+
+from .cache_url import cache_from_url
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,6 +36,12 @@ ALLOWED_HOSTS = [
 ]
 
 
+# YATUBE_PROFILE=production включает настройки для боевого сервера:
+# кэш шаблонов, постоянные соединения с БД и настройки SQLite.
+PROFILE = os.getenv('YATUBE_PROFILE', 'development')
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -50,6 +59,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,12 +91,32 @@ TEMPLATES = [
     },
 ]
 
+# В производственном профиле шаблоны разбираются один раз на воркер и
+# заранее, при его запуске (core.warmup.warm_templates).
+TEMPLATE_WARMUP = PROFILE == 'production'
+if PROFILE == 'production':
+    del TEMPLATES[0]['APP_DIRS']
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# ASGI-приложение (yatube.asgi) держит медленных клиентов в цикле
+# событий, а представления и ORM выполняет в пуле из стольких потоков.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', '8'))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# В производственном профиле — постоянные соединения с проверкой перед
+# каждым запросом и настройки SQLite для одновременных чтения и записи:
+# WAL, synchronous=NORMAL, mmap и ожидание блокировки.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -92,6 +124,51 @@ DATABASES = {
     }
 }
 
+PRODUCTION_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('YATUBE_SQLITE_MMAP_SIZE', 256 * 2 ** 20)),
+    'busy_timeout': int(os.getenv('YATUBE_SQLITE_BUSY_TIMEOUT', '5000')),
+}
+DB_HEALTH_CHECKS = False
+SQLITE_PRAGMAS = {}
+
+if PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = int(
+        os.getenv('YATUBE_CONN_MAX_AGE', '600')
+    )
+    DB_HEALTH_CHECKS = True
+    SQLITE_PRAGMAS = PRODUCTION_SQLITE_PRAGMAS
+
+# Реплики только для чтения: пути к файлам SQLite (или имена баз для
+# того же движка) через запятую в YATUBE_DATABASE_REPLICAS.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_DATABASE_REPLICAS', '').split(','))):
+    alias = f'replica_{number + 1}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], NAME=name.strip(), TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yatube.db_routers.ReplicaRouter']
+REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'about:author',
+    'about:tech',
+]
+# GET-представления, которые меняют данные: после них, как после POST,
+# чтение идёт из основной базы.
+REPLICA_WRITE_VIEWS = [
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+]
+REPLICA_STICKY_SECONDS = int(os.getenv('YATUBE_REPLICA_STICKY_SECONDS', '15'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -140,20 +217,85 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# В производственном профиле collectstatic добавляет хэш к именам файлов
+# и кладёт рядом .gz и .br копии, а StaticFilesMiddleware отдаёт их с
+# кэшированием на год. HTML и ленты сжимаются на лету от
+# GZIP_MIN_LENGTH байт.
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+GZIP_MIN_LENGTH = int(os.getenv('YATUBE_GZIP_MIN_LENGTH', '1024'))
+if PROFILE == 'production':
+    STATICFILES_STORAGE = (
+        'core.storage.CompressedManifestStaticFilesStorage'
+    )
+    MIDDLEWARE.insert(0, 'core.middleware.StaticFilesMiddleware')
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
 # Cache
+# Кэш общий для всех процессов задаётся через YATUBE_CACHE_URL,
+# например file:///var/cache/yatube или redis://127.0.0.1:6379/1.
+# Смена YATUBE_CACHE_VERSION разом делает недействительными все ключи.
+
+CACHE_URL = os.getenv('YATUBE_CACHE_URL', 'locmem://')
 
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': cache_from_url(
+        CACHE_URL,
+        key_prefix=os.getenv('YATUBE_CACHE_PREFIX', 'yatube'),
+        version=int(os.getenv('YATUBE_CACHE_VERSION', '1')),
+    ),
 }
 
 
 # Errors
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+
+# Performance
+# Доля запросов, для которых считаются запросы к БД и кэш; время ответа
+# учитывается для всех. Время шаблонов считается только при
+# YATUBE_PERF_TEMPLATE_TIMING=1: для этого подменяется Template.render.
+# /metrics отдаётся по токену YATUBE_METRICS_TOKEN в заголовке
+# Authorization: Bearer. Без токена — только прямым запросам с адресов
+# METRICS_ALLOWED_IPS; за обратным прокси все клиенты приходят с его
+# адреса, поэтому в производственном профиле список по умолчанию пуст.
+
+PERF_SAMPLE_RATE = float(os.getenv(
+    'YATUBE_PERF_SAMPLE_RATE', '0' if TESTING else '0.05'
+))
+PERF_SERVER_TIMING = os.getenv('YATUBE_SERVER_TIMING', '1') == '1'
+PERF_TEMPLATE_TIMING = os.getenv('YATUBE_PERF_TEMPLATE_TIMING', '0') == '1'
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    address for address in os.getenv(
+        'YATUBE_METRICS_ALLOWED_IPS',
+        '' if PROFILE == 'production' else '127.0.0.1,::1',
+    ).split(',') if address
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'performance': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['performance'],
+            'level': os.getenv('YATUBE_PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}